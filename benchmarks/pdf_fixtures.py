@@ -0,0 +1,43 @@
+import random
+
+import fitz  # PyMuPDF
+
+_SENTENCE = (
+    "Quarterly results show steady growth across every region, driven by new customers, "
+    "better retention and a leaner delivery process that the team refined over the year. "
+)
+
+def make_pdf(page_count: int, visual_every: int = 3, stamp: str = "", seed: int = 0) -> bytes:
+    """
+    Builds a synthetic A4 PDF in memory for benchmarks.
+
+    Most pages are plain paragraphs (described from their text layer when the text fast
+    path is on); every visual_every-th page also carries a bar chart made of vector
+    drawings, so it is classified as visual and rendered for the vision model.
+
+    Args:
+        page_count: Number of pages.
+        visual_every: Period of chart pages (0 for text-only documents).
+        stamp: Text printed on every page, e.g. a request id, so that documents built
+            for different requests never share cached or coalesced page descriptions.
+        seed: Seeds the chart shapes.
+
+    Returns:
+        The PDF bytes.
+    """
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for i in range(page_count):
+        page = doc.new_page(width=595, height=842)
+        page.insert_text((50, 60), f"Benchmark document {stamp} - page {i + 1} of {page_count}", fontsize=14)
+        page.insert_textbox(fitz.Rect(50, 90, 545, 400), _SENTENCE * 6, fontsize=10)
+
+        if visual_every and (i + 1) % visual_every == 0:
+            # 30 bars exceed the vector-drawing threshold of the page classifier
+            for bar in range(30):
+                height = rng.randint(20, 300)
+                x = 60 + bar * 16
+                page.draw_rect(fitz.Rect(x, 780 - height, x + 12, 780), color=(0, 0, 0), fill=(0.2, 0.4, 0.8))
+    data = doc.tobytes()
+    doc.close()
+    return data
@@ -0,0 +1,325 @@
+"""
+Load-tests the LinkGenix API against the offline stub backend.
+
+Starts the API in a subprocess (GENERATOR_BACKEND=stub, no upstream rate limits, response
+cache off unless --cache is given) for every scenario and concurrency level, drives it with
+concurrent requests, and reports throughput, latency percentiles, peak server RSS and the
+per-stage breakdown from the Server-Timing header. Results are written as JSON and CSV.
+
+Usage (from the project root):
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --scenarios analyze-pdf --pdf-pages 1,50,200 --concurrency 1,8
+    python benchmarks/run_benchmarks.py --env STUB_TEXT_LATENCY_MS=200 --compare benchmarks/results/bench-previous.json
+"""
+import argparse
+import csv
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from benchmarks.pdf_fixtures import make_pdf
+
+TEXT_SCENARIOS = {
+    "generate-content": ("/generate-content/", "User Intent:\nShare what our team learned shipping release {i}\n\nReference Content:\n"),
+    "format-content": ("/format-content/", "Draft {i}: we shipped a new release this week and learned a lot about planning and feedback."),
+    "optimize-seo": ("/optimize-seo/", "Post {i}: Three lessons from shipping our latest release.\n\n1. Plan early.\n2. Ask for feedback.\n3. Celebrate."),
+    "generate-image": ("/generate-image/", "Original Query: Release {i} retrospective\n\nPost Content: Three lessons from shipping our latest release."),
+}
+SCENARIOS = list(TEXT_SCENARIOS) + ["analyze-pdf"]
+
+def _int_list(value: str) -> list:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def percentile(sorted_values: list, q: float) -> float:
+    """Linear-interpolated percentile (q in 0-100) of an already sorted list."""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * q / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+def parse_server_timing(header: str) -> dict:
+    """Parses "stage;dur=12.3, other;dur=4" into {stage: milliseconds}."""
+    stages = {}
+    for item in (header or "").split(","):
+        name, _, params = item.strip().partition(";")
+        if name and params.startswith("dur="):
+            try:
+                stages[name] = float(params[len("dur="):])
+            except ValueError:
+                continue
+    return stages
+
+class ServerProcess:
+    """Runs the API with uvicorn in a subprocess for the duration of a with block."""
+
+    def __init__(self, env: dict, startup_timeout: float = 60):
+        self.port = _free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self.env = env
+        self.startup_timeout = startup_timeout
+        self.process = None
+        self._log = None
+
+    def __enter__(self):
+        self._log = tempfile.TemporaryFile(mode="w+")
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "src.api.server:app", "--host", "127.0.0.1",
+             "--port", str(self.port), "--log-level", "warning"],
+            cwd=project_root, env=self.env, stdout=self._log, stderr=subprocess.STDOUT
+        )
+        deadline = time.time() + self.startup_timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                break
+            try:
+                if requests.get(f"{self.base_url}/", timeout=1).ok:
+                    return self
+            except requests.exceptions.RequestException:
+                time.sleep(0.2)
+        self.__exit__(None, None, None)
+        raise RuntimeError(f"The API did not start:\n{self.log_tail()}")
+
+    def peak_rss_mb(self):
+        """Peak resident set size of the server so far (Linux only; None elsewhere)."""
+        try:
+            with open(f"/proc/{self.process.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        return round(int(line.split()[1]) / 1024.0, 1)
+        except OSError:
+            pass
+        return None
+
+    def log_tail(self, lines: int = 30) -> str:
+        self._log.seek(0)
+        return "".join(self._log.readlines()[-lines:])
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        if self._log:
+            self._log.close()
+
+def run_load(base_url: str, build_request, total_requests: int, concurrency: int, timeout: float) -> dict:
+    """
+    Sends total_requests requests with at most concurrency in flight and aggregates them.
+
+    Args:
+        build_request: Maps a request index to (path, requests.post keyword arguments).
+    """
+    local = threading.local()
+
+    def one(i: int) -> dict:
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        path, kwargs = build_request(i)
+        started = time.perf_counter()
+        try:
+            response = session.post(f"{base_url}{path}", timeout=timeout, **kwargs)
+            status = response.status_code
+            stages = parse_server_timing(response.headers.get("Server-Timing"))
+        except requests.exceptions.RequestException as e:
+            status, stages = type(e).__name__, {}
+        return {"latency": time.perf_counter() - started, "status": status, "stages": stages}
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(one, range(total_requests)))
+    wall = time.perf_counter() - started
+
+    ok = []
+    errors = {}
+    for sample in samples:
+        if isinstance(sample["status"], int) and sample["status"] < 400:
+            ok.append(sample)
+        else:
+            errors[str(sample["status"])] = errors.get(str(sample["status"]), 0) + 1
+
+    latencies = sorted(sample["latency"] * 1000 for sample in ok)
+    stage_totals = {}
+    for sample in ok:
+        for stage, ms in sample["stages"].items():
+            stage_totals[stage] = stage_totals.get(stage, 0.0) + ms
+
+    def rounded(value):
+        return None if value is None else round(value, 1)
+
+    return {
+        "requests": total_requests,
+        "succeeded": len(ok),
+        "failed": total_requests - len(ok),
+        "errors": errors,
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(ok) / wall, 3) if wall else None,
+        "latency_ms": {
+            "mean": rounded(sum(latencies) / len(latencies)) if latencies else None,
+            "p50": rounded(percentile(latencies, 50)),
+            "p95": rounded(percentile(latencies, 95)),
+            "p99": rounded(percentile(latencies, 99)),
+            "max": rounded(latencies[-1]) if latencies else None,
+        },
+        # Mean per successful request; concurrent stages (e.g. PDF pages) add up
+        "stages_ms": {stage: round(total / len(ok), 1) for stage, total in sorted(stage_totals.items())},
+    }
+
+def _text_request(path: str, template: str):
+    def build(i: int):
+        return path, {
+            "data": template.format(i=i).encode("utf-8"),
+            "headers": {"Content-Type": "text/plain; charset=utf-8"},
+        }
+    return build
+
+def _pdf_request(pdfs: list):
+    def build(i: int):
+        return "/analyze-pdf/", {"files": {"file": (f"bench-{i}.pdf", pdfs[i], "application/pdf")}}
+    return build
+
+def server_env(args) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "GENERATOR_BACKEND": "stub",
+        "GEMINI_REQUESTS_PER_MINUTE": "0",
+        "HF_REQUESTS_PER_MINUTE": "0",
+        "RESPONSE_CACHE_ENABLED": "true" if args.cache else "false",
+        "STUB_RANDOM_SEED": env.get("STUB_RANDOM_SEED", "0"),
+        "LINKGENIX_DATA_DIR": args.data_dir,
+    })
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+    return env
+
+def plan_runs(args) -> list:
+    """Expands the arguments into (scenario name, endpoint, pdf pages, request builder, request count) tuples."""
+    runs = []
+    for scenario in args.scenarios:
+        if scenario == "analyze-pdf":
+            for pages in args.pdf_pages:
+                pdfs = [make_pdf(pages, stamp=f"r{i}", seed=i) for i in range(args.pdf_requests)]
+                runs.append((f"analyze-pdf-{pages}p", "/analyze-pdf/", pages, _pdf_request(pdfs), args.pdf_requests))
+        else:
+            path, template = TEXT_SCENARIOS[scenario]
+            count = args.image_requests if scenario == "generate-image" else args.requests
+            runs.append((scenario, path, None, _text_request(path, template), count))
+    return runs
+
+def compare(results: list, baseline_path: str):
+    """Prints throughput and p95 changes against a previous results file."""
+    with open(baseline_path) as f:
+        baseline = {(r["scenario"], r["concurrency"]): r for r in json.load(f)["results"]}
+    print(f"\nComparison with {baseline_path}:")
+    for result in results:
+        previous = baseline.get((result["scenario"], result["concurrency"]))
+        if previous is None:
+            continue
+        changes = []
+        for label, new, old in (
+            ("throughput", result["throughput_rps"], previous["throughput_rps"]),
+            ("p95", result["latency_ms"]["p95"], previous["latency_ms"]["p95"]),
+        ):
+            if new is not None and old:
+                changes.append(f"{label} {old} -> {new} ({(new - old) / old * 100:+.1f}%)")
+        print(f"  {result['scenario']} @ c={result['concurrency']}: {', '.join(changes) or 'n/a'}")
+
+def write_results(results: list, metadata: dict, output_dir: str) -> str:
+    os.makedirs(output_dir, exist_ok=True)
+    base = os.path.join(output_dir, f"bench-{time.strftime('%Y%m%d-%H%M%S')}")
+    with open(f"{base}.json", "w") as f:
+        json.dump({"metadata": metadata, "results": results}, f, indent=2)
+
+    stages = sorted({stage for result in results for stage in result["stages_ms"]})
+    with open(f"{base}.csv", "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["scenario", "concurrency", "requests", "succeeded", "failed", "throughput_rps",
+                         "p50_ms", "p95_ms", "p99_ms", "peak_rss_mb"] + [f"stage_{stage}_ms" for stage in stages])
+        for r in results:
+            writer.writerow([r["scenario"], r["concurrency"], r["requests"], r["succeeded"], r["failed"],
+                             r["throughput_rps"], r["latency_ms"]["p50"], r["latency_ms"]["p95"],
+                             r["latency_ms"]["p99"], r["peak_rss_mb"]] + [r["stages_ms"].get(stage) for stage in stages])
+    return base
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=project_root, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the LinkGenix API against the stub backend.")
+    parser.add_argument("--scenarios", type=lambda v: v.split(","), default=SCENARIOS,
+                        help=f"Comma-separated subset of: {', '.join(SCENARIOS)}.")
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 4, 16], help="Concurrency levels, e.g. 1,4,16.")
+    parser.add_argument("--requests", type=int, default=40, help="Requests per text scenario and concurrency level.")
+    parser.add_argument("--image-requests", type=int, default=12, help="Requests per image scenario and concurrency level.")
+    parser.add_argument("--pdf-pages", type=_int_list, default=[1, 10, 50, 200], help="PDF sizes in pages.")
+    parser.add_argument("--pdf-requests", type=int, default=4, help="Requests per PDF size and concurrency level.")
+    parser.add_argument("--timeout", type=float, default=600, help="Per-request timeout in seconds.")
+    parser.add_argument("--cache", action="store_true", help="Keep the response cache on (off by default).")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Extra server setting, e.g. STUB_TEXT_LATENCY_MS=200. Repeatable.")
+    parser.add_argument("--output-dir", default=os.path.join(project_root, "benchmarks", "results"))
+    parser.add_argument("--compare", help="A previous results JSON to compare against.")
+    args = parser.parse_args(argv)
+
+    unknown = [scenario for scenario in args.scenarios if scenario not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenario(s): {', '.join(unknown)}.")
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="linkgenix-bench-") as data_dir:
+        args.data_dir = data_dir
+        env = server_env(args)
+        for scenario, endpoint, pages, build_request, count in plan_runs(args):
+            for concurrency in args.concurrency:
+                # A fresh server per run, so peak RSS and caches are not carried over
+                with ServerProcess(env) as server:
+                    result = run_load(server.base_url, build_request, count, concurrency, args.timeout)
+                    result.update(scenario=scenario, endpoint=endpoint, pdf_pages=pages,
+                                  concurrency=concurrency, peak_rss_mb=server.peak_rss_mb())
+                results.append(result)
+                latency = result["latency_ms"]
+                print(f"{scenario:<22} c={concurrency:<3} ok={result['succeeded']}/{count} "
+                      f"rps={result['throughput_rps']} p50={latency['p50']} p95={latency['p95']} "
+                      f"p99={latency['p99']} ms rss={result['peak_rss_mb']} MB")
+
+    metadata = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cache": args.cache,
+        "server_settings": {key: value for key, value in env.items() if key.startswith(("STUB_", "GENERATOR_", "PDF_", "RESPONSE_CACHE_", "BATCH_"))},
+    }
+    base = write_results(results, metadata, args.output_dir)
+    print(f"\nResults written to {base}.json and {base}.csv")
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
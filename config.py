@@ -1,4 +1,5 @@
 import os
+import json
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -11,6 +12,18 @@ HF_TOKEN = os.getenv("HF_TOKEN")
 # --- Model Names ---
 DEFAULT_GEMINI_FLASH_MODEL = "gemini-1.5-flash-latest" # Changed from gemini-2.0-flash as it's more common
 DEFAULT_GEMINI_PRO_MODEL = "gemini-1.5-flash-latest"
+DEFAULT_IMAGE_MODEL = "black-forest-labs/FLUX.1-dev"
+
+# --- Gemini Context Cache ---
+# Static system prompts at least this large (estimated tokens; the API minimum for explicit
+# caching) are uploaded once as cached context and referenced by every call; smaller ones
+# are sent as system_instruction on each call
+GEMINI_CONTEXT_CACHE_ENABLED = os.getenv("GEMINI_CONTEXT_CACHE_ENABLED", "true").lower() == "true"
+GEMINI_CONTEXT_CACHE_MIN_TOKENS = int(os.getenv("GEMINI_CONTEXT_CACHE_MIN_TOKENS", "32768"))
+GEMINI_CONTEXT_CACHE_TTL_SECONDS = int(os.getenv("GEMINI_CONTEXT_CACHE_TTL_SECONDS", "3600"))
+
+# --- Hugging Face Inference ---
+HF_INFERENCE_PROVIDER = os.getenv("HF_INFERENCE_PROVIDER", "hf-inference")
 
 # --- File Paths ---
 # Assuming 'assests' is relative to the 'src/notebooks' directory for notebooks
@@ -21,11 +34,145 @@ ASSETS_DIR = os.path.join(NOTEBOOKS_DIR, "src", "notebooks", "assests") # Adjust
 DEFAULT_IMAGE_PATH = os.path.join(ASSETS_DIR, "website-sitemap (1).png")
 DEFAULT_PDF_PATH = os.path.join(ASSETS_DIR, "MedicalAI_Chatbot.pdf")
 
+# Local storage for caches, job state and generated files
+DATA_DIR = os.getenv("LINKGENIX_DATA_DIR", os.path.join(NOTEBOOKS_DIR, "data"))
+
 # --- PDF Conversion ---
 DEFAULT_PDF_DPI = 300
+# Resolution policy for pages sent to the vision model: "fixed" (DEFAULT_PDF_DPI),
+# "long_edge" (PDF_TARGET_LONG_EDGE pixels on the longest side) or "auto" (by page size and text density)
+PDF_RESOLUTION_POLICY = os.getenv("PDF_RESOLUTION_POLICY", "auto")
+PDF_TARGET_LONG_EDGE = int(os.getenv("PDF_TARGET_LONG_EDGE", "1280"))
+PDF_DENSE_TEXT_LONG_EDGE = int(os.getenv("PDF_DENSE_TEXT_LONG_EDGE", "2048"))  # Used by "auto" for pages with small print
+PDF_DENSE_TEXT_CHARS_PER_SQ_INCH = float(os.getenv("PDF_DENSE_TEXT_CHARS_PER_SQ_INCH", "25"))
+PDF_MIN_DPI = 50
+PDF_MAX_DPI = 300
+# Encoding of rendered pages before upload: "png", "jpeg" or "webp"
+PDF_IMAGE_FORMAT = os.getenv("PDF_IMAGE_FORMAT", "jpeg")
+PDF_IMAGE_QUALITY = int(os.getenv("PDF_IMAGE_QUALITY", "85"))
+
+# --- PDF Page Classification ---
+# Text-only pages are described from their text layer; only visual pages go to Gemini
+PDF_TEXT_FAST_PATH = os.getenv("PDF_TEXT_FAST_PATH", "true").lower() == "true"
+PDF_TEXT_MIN_CHARS = int(os.getenv("PDF_TEXT_MIN_CHARS", "200"))  # Fewer characters means a scan or a picture-only page
+PDF_FIGURE_MIN_AREA_RATIO = float(os.getenv("PDF_FIGURE_MIN_AREA_RATIO", "0.05"))  # Smaller images (logos, icons) are ignored
+PDF_MAX_TEXT_PAGE_DRAWINGS = int(os.getenv("PDF_MAX_TEXT_PAGE_DRAWINGS", "25"))  # More vector paths means a chart or diagram
+
+# --- Concurrency ---
+# Maximum number of PDF pages sent to Gemini at the same time in /analyze-pdf/
+PDF_ANALYSIS_CONCURRENCY = int(os.getenv("PDF_ANALYSIS_CONCURRENCY", "8"))
+# Pages packed into one Gemini request in /analyze-pdf/ (1 = one request per page),
+# capped so that the estimated tokens of a batch stay within PDF_BATCH_TOKEN_BUDGET
+PDF_BATCH_SIZE = int(os.getenv("PDF_BATCH_SIZE", "1"))
+PDF_BATCH_TOKEN_BUDGET = int(os.getenv("PDF_BATCH_TOKEN_BUDGET", "8192"))
+PDF_BATCH_OUTPUT_TOKENS_PER_PAGE = int(os.getenv("PDF_BATCH_OUTPUT_TOKENS_PER_PAGE", "500"))
+GEMINI_IMAGE_TOKENS = 258  # Gemini bills each image as a fixed number of input tokens
+# Size of the dedicated thread pool that runs blocking Gemini / Hugging Face calls
+GENERATOR_MAX_WORKERS = int(os.getenv("GENERATOR_MAX_WORKERS", "32"))
+# Limits for /batch/generate/: model calls in flight overall and per model.
+# MODEL_CONCURRENCY_OVERRIDES takes a JSON object, e.g. {"gemini-1.5-pro-latest": 2}
+BATCH_GLOBAL_CONCURRENCY = int(os.getenv("BATCH_GLOBAL_CONCURRENCY", "8"))
+BATCH_PER_MODEL_CONCURRENCY = int(os.getenv("BATCH_PER_MODEL_CONCURRENCY", "4"))
+MODEL_CONCURRENCY_OVERRIDES = json.loads(os.getenv("MODEL_CONCURRENCY_OVERRIDES", "{}"))
+# Gemini models a batch job may pick with model_name (JSON list). Defaults to the default
+# models plus those with a concurrency override
+BATCH_ALLOWED_MODELS = json.loads(os.getenv("BATCH_ALLOWED_MODELS", "[]")) or sorted(
+    {DEFAULT_GEMINI_FLASH_MODEL, DEFAULT_GEMINI_PRO_MODEL, *MODEL_CONCURRENCY_OVERRIDES}
+)
+BATCH_MAX_JOBS = int(os.getenv("BATCH_MAX_JOBS", "200"))
+
+# --- Reference Condensation ---
+# Reference content (e.g. a PDF analysis) estimated above this many tokens is summarized
+# map-reduce style before content generation (0 disables condensation)
+CONDENSE_TOKEN_BUDGET = int(os.getenv("CONDENSE_TOKEN_BUDGET", "6000"))
+CONDENSE_GROUP_TOKENS = int(os.getenv("CONDENSE_GROUP_TOKENS", "4000"))  # Input per summarization call
+CONDENSE_CONCURRENCY = int(os.getenv("CONDENSE_CONCURRENCY", "4"))
+CONDENSE_MAX_ROUNDS = int(os.getenv("CONDENSE_MAX_ROUNDS", "2"))
+CONDENSE_MODEL = os.getenv("CONDENSE_MODEL", DEFAULT_GEMINI_FLASH_MODEL)
+CHARS_PER_TOKEN = float(os.getenv("CHARS_PER_TOKEN", "4"))  # Token estimate for English text
+
+# --- Page Retrieval ---
+# Analyzed pages are indexed per document so generation can send only the relevant ones
+PAGE_INDEX_DB_PATH = os.getenv("PAGE_INDEX_DB_PATH", os.path.join(DATA_DIR, "page_index.sqlite3"))
+PAGE_INDEX_CACHE_DOCUMENTS = int(os.getenv("PAGE_INDEX_CACHE_DOCUMENTS", "32"))  # Indexes kept in memory
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "5"))
+BM25_K1 = float(os.getenv("BM25_K1", "1.5"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+# Optional sentence-transformers model run on CPU, e.g. "sentence-transformers/all-MiniLM-L6-v2"
+# (empty for BM25 only); its ranking is fused with BM25
+RETRIEVAL_EMBEDDING_MODEL = os.getenv("RETRIEVAL_EMBEDDING_MODEL", "")
+
+# --- Generator Backend ---
+# "live" calls Gemini and Hugging Face; "stub" answers offline (load tests, profiling)
+GENERATOR_BACKEND = os.getenv("GENERATOR_BACKEND", "live").lower()
+STUB_LATENCY_DISTRIBUTION = os.getenv("STUB_LATENCY_DISTRIBUTION", "lognormal")  # fixed, uniform, normal or lognormal
+STUB_TEXT_LATENCY_MS = float(os.getenv("STUB_TEXT_LATENCY_MS", "800"))
+STUB_VISION_LATENCY_MS = float(os.getenv("STUB_VISION_LATENCY_MS", "1500"))
+STUB_IMAGE_LATENCY_MS = float(os.getenv("STUB_IMAGE_LATENCY_MS", "4000"))
+STUB_LATENCY_JITTER_MS = float(os.getenv("STUB_LATENCY_JITTER_MS", "200"))
+STUB_ERROR_RATE = float(os.getenv("STUB_ERROR_RATE", "0"))
+STUB_ERROR_CODES = [int(code) for code in os.getenv("STUB_ERROR_CODES", "429,503").split(",") if code.strip()]
+STUB_RECORDINGS_PATH = os.getenv("STUB_RECORDINGS_PATH", "")  # JSON {sha256 of prompt: answer}
+STUB_RANDOM_SEED = int(os.getenv("STUB_RANDOM_SEED", "0"))
+STUB_TEXT_WORDS = int(os.getenv("STUB_TEXT_WORDS", "150"))
+STUB_STREAM_CHUNKS = int(os.getenv("STUB_STREAM_CHUNKS", "8"))
+STUB_IMAGE_SIZE = int(os.getenv("STUB_IMAGE_SIZE", "1024"))
+
+# --- Upstream Resilience ---
+# Token-bucket limits per provider/model pair, in requests per minute (0 disables a limit)
+UPSTREAM_REQUESTS_PER_MINUTE = {
+    "gemini": float(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "60")),
+    "hf": float(os.getenv("HF_REQUESTS_PER_MINUTE", "10")),
+}
+# UPSTREAM_RATE_LIMIT_OVERRIDES takes a JSON object keyed by "provider:model", e.g. {"gemini:gemini-1.5-pro-latest": 5}
+UPSTREAM_RATE_LIMIT_OVERRIDES = json.loads(os.getenv("UPSTREAM_RATE_LIMIT_OVERRIDES", "{}"))
+UPSTREAM_BURST = int(os.getenv("UPSTREAM_BURST", "5"))
+UPSTREAM_MAX_ATTEMPTS = int(os.getenv("UPSTREAM_MAX_ATTEMPTS", "4"))
+UPSTREAM_BACKOFF_BASE_SECONDS = float(os.getenv("UPSTREAM_BACKOFF_BASE_SECONDS", "1"))
+UPSTREAM_BACKOFF_MAX_SECONDS = float(os.getenv("UPSTREAM_BACKOFF_MAX_SECONDS", "30"))
+# Budget for one logical call, including rate-limit waits and retries
+UPSTREAM_DEADLINE_SECONDS = {
+    "gemini": float(os.getenv("GEMINI_CALL_DEADLINE_SECONDS", "120")),
+    "hf": float(os.getenv("HF_CALL_DEADLINE_SECONDS", "180")),
+}
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+
+# --- Response Cache ---
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "86400"))
+# Set to a file path (e.g. os.path.join(DATA_DIR, "response_cache.sqlite3")) to keep cached responses across restarts
+RESPONSE_CACHE_DB_PATH = os.getenv("RESPONSE_CACHE_DB_PATH", "")
+
+# --- Image Store ---
+# Generated images are stored by a hash of (image prompt, model, seed) and reused
+IMAGE_STORE_DIR = os.getenv("IMAGE_STORE_DIR", os.path.join(DATA_DIR, "images"))
+DEFAULT_IMAGE_SEED = int(os.getenv("DEFAULT_IMAGE_SEED", "0"))
+# Default delivery settings; each request can override them
+IMAGE_OUTPUT_FORMAT = os.getenv("IMAGE_OUTPUT_FORMAT", "png")  # png, jpeg or webp
+IMAGE_OUTPUT_QUALITY = int(os.getenv("IMAGE_OUTPUT_QUALITY", "85"))
+IMAGE_OUTPUT_SIZE = os.getenv("IMAGE_OUTPUT_SIZE", "original")  # original, linkedin, square or thumbnail
+
+# --- Image Jobs ---
+IMAGE_JOBS_DB_PATH = os.getenv("IMAGE_JOBS_DB_PATH", os.path.join(DATA_DIR, "image_jobs.sqlite3"))
+IMAGE_JOB_WORKERS = int(os.getenv("IMAGE_JOB_WORKERS", "2"))
+IMAGE_JOB_MAX_ATTEMPTS = int(os.getenv("IMAGE_JOB_MAX_ATTEMPTS", "3"))
+IMAGE_JOB_RETRY_DELAY_SECONDS = float(os.getenv("IMAGE_JOB_RETRY_DELAY_SECONDS", "2"))
+
+# --- Logging ---
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# LOG_LEVELS takes a JSON object of per-logger levels, e.g. {"linkgenix.text": "DEBUG"}
+LOG_LEVELS = json.loads(os.getenv("LOG_LEVELS", "{}"))
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()  # json or text
+# Records are written by a background thread; when this many are waiting, new ones are dropped
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Prompts are logged at DEBUG level, for this fraction of calls, cut to LOG_PROMPT_MAX_CHARS
+LOG_PROMPT_SAMPLE_RATE = float(os.getenv("LOG_PROMPT_SAMPLE_RATE", "0.01"))
+LOG_PROMPT_MAX_CHARS = int(os.getenv("LOG_PROMPT_MAX_CHARS", "500"))
 
 # --- Validation ---
-if not GOOGLE_API_KEY:
+if not GOOGLE_API_KEY and GENERATOR_BACKEND == "live":
     print("Warning: GOOGLE_API_KEY not found in environment variables. Please set it in your .env file.")
     # You might want to raise an error here depending on your application's needs
     # raise ValueError("API key not found. Please set the GOOGLE_API_KEY environment variable.")
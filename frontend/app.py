@@ -1,6 +1,9 @@
 import streamlit as st
 import requests
 import io
+import json
+import random
+import time
 import os
 import sys
 from PIL import Image
@@ -21,13 +24,22 @@ except ImportError as e:
 
 # Set up the API URL
 API_URL = "http://localhost:8000"  # Update this URL if your API is hosted elsewhere
+IMAGE_JOB_POLL_INTERVAL_SECONDS = 2
+IMAGE_JOB_WAIT_SECONDS = 300
+# Label -> size preset understood by the API; images are fetched as JPEG to keep downloads small
+IMAGE_SIZE_OPTIONS = {
+    "LinkedIn post (1200×627)": "linkedin",
+    "Square (1080×1080)": "square",
+    "Original": "original",
+}
+IMAGE_OUTPUT_QUALITY = 90
 
 def reset_session():
     """Clears relevant session state variables to start over."""
     keys_to_reset = [
-        'user_query', 'pdf_analysis', 'generated_content',
+        'user_query', 'pdf_analysis', 'document_id', 'generated_content',
         'formatted_content', 'seo_content', 'generated_image',
-        'current_step'
+        'image_job_id', 'current_step'
     ]
     for key in keys_to_reset:
         if key in st.session_state:
@@ -50,6 +62,8 @@ def main():
         st.session_state.user_query = ""
     if 'pdf_analysis' not in st.session_state:
         st.session_state.pdf_analysis = ""
+    if 'document_id' not in st.session_state:
+        st.session_state.document_id = None
     if 'generated_content' not in st.session_state:
         st.session_state.generated_content = ""
     if 'formatted_content' not in st.session_state:
@@ -116,6 +130,118 @@ def main():
     elif st.session_state.current_step == 3:
         step3_optimize_and_finalize()
 
+def stream_pdf_analysis(uploaded_file):
+    """
+    Posts the PDF to the streaming analysis endpoint and renders each page's
+    description as soon as it arrives. The id under which the server indexed the
+    pages is kept in st.session_state.document_id.
+
+    Returns:
+        The combined analysis in page order, or None if the server reported an error.
+    """
+    progress = st.progress(0.0, text="Uploading PDF...")
+    preview = st.empty()
+    pages = {}
+
+    files = {"file": uploaded_file}
+    with requests.post(f"{API_URL}/analyze-pdf/stream/", files=files, stream=True) as response:
+        if response.status_code != 200:
+            progress.empty()
+            st.error(f"Error analyzing PDF: {response.status_code} - {response.text}")
+            return None
+
+        for line in response.iter_lines(decode_unicode=True):
+            if not line:
+                continue
+            event = json.loads(line)
+            if event["event"] == "start":
+                progress.progress(0.0, text=f"Analyzing {event['page_count']} pages...")
+            elif event["event"] == "page":
+                pages[event["page"]] = event["description"]
+                progress.progress(
+                    event["completed"] / event["page_count"],
+                    text=f"Analyzed {event['completed']}/{event['page_count']} pages ({event['elapsed_seconds']:.0f}s)"
+                )
+                preview.text_area(
+                    "Analysis so far:",
+                    value="\n".join(pages[page] for page in sorted(pages)),
+                    height=200,
+                    disabled=True
+                )
+            elif event["event"] == "done":
+                st.session_state.document_id = event.get("document_id")
+            elif event["event"] == "error":
+                progress.empty()
+                st.error(event["detail"])
+                return None
+
+    progress.empty()
+    preview.empty()
+    return "\n".join(pages[page] for page in sorted(pages))
+
+def stream_generation(endpoint, text, params=None):
+    """
+    Posts text to one of the text endpoints in streaming mode and renders the
+    tokens as they arrive.
+
+    Returns:
+        The complete generated text.
+    """
+    placeholder = st.empty()
+    received = []
+    with requests.post(
+        f"{API_URL}{endpoint}",
+        params={**(params or {}), "stream": "true"},
+        data=text.encode('utf-8'),
+        headers={"Content-Type": "text/plain; charset=utf-8"},
+        stream=True
+    ) as response:
+        response.raise_for_status()
+        response.encoding = "utf-8"
+        for chunk in response.iter_content(chunk_size=None, decode_unicode=True):
+            if chunk:
+                received.append(chunk)
+                placeholder.markdown("".join(received))
+    placeholder.empty()
+    return "".join(received)
+
+def wait_for_image_job(job_id, size="linkedin"):
+    """
+    Polls an image job until it finishes, then downloads the image as a JPEG
+    at the given size preset.
+
+    Returns:
+        The image bytes, or None if the job failed or is still running after
+        IMAGE_JOB_WAIT_SECONDS (it keeps running server-side and can be resumed).
+    """
+    deadline = time.time() + IMAGE_JOB_WAIT_SECONDS
+    with st.spinner("Generating image... This can take some time."):
+        while time.time() < deadline:
+            status_response = requests.get(f"{API_URL}/image-jobs/{job_id}", timeout=10)
+            if status_response.status_code == 404:
+                st.error("The image job no longer exists. Please generate the image again.")
+                del st.session_state.image_job_id
+                return None
+            status_response.raise_for_status()
+            job = status_response.json()
+
+            if job["status"] == "succeeded":
+                result_response = requests.get(
+                    f"{API_URL}/image-jobs/{job_id}/result",
+                    params={"format": "jpeg", "quality": IMAGE_OUTPUT_QUALITY, "size": size},
+                    timeout=30
+                )
+                result_response.raise_for_status()
+                return result_response.content
+            if job["status"] == "failed":
+                st.error(f"Image generation failed: {job['error']}")
+                del st.session_state.image_job_id
+                return None
+            time.sleep(IMAGE_JOB_POLL_INTERVAL_SECONDS)
+
+    st.warning("The image is still being generated. Click 'Check Image Status' to keep waiting.")
+    return None
+
 def step1_input_and_analysis():
     st.header("Step 1: Input & Analysis")
     st.markdown("Provide your core idea and optionally upload a PDF for context.")
@@ -144,24 +270,20 @@ def step1_input_and_analysis():
     with col1:
         analyze_disabled = uploaded_file is None
         analyze_help = "Upload a PDF file first" if analyze_disabled else "Analyze the uploaded PDF for context"
-        if st.button("🔍 Analyze PDF", disabled=analyze_disabled, help=analyze_help, use_container_width=True):
-            if uploaded_file is not None:
-                with st.spinner("Analyzing PDF... Please wait."):
-                    try:
-                        files = {"file": uploaded_file}
-                        response = requests.post(f"{API_URL}/analyze-pdf/", files=files)
-
-                        if response.status_code == 200:
-                            pdf_analysis = response.json().get("analysis", "")
-                            st.session_state.pdf_analysis = pdf_analysis
-                            st.success("PDF analyzed successfully!")
-                            st.rerun()
-                        else:
-                            st.error(f"Error analyzing PDF: {response.status_code} - {response.text}")
-                    except requests.exceptions.RequestException as e:
-                        st.error(f"Connection error during PDF analysis: {str(e)}")
-                    except Exception as e:
-                        st.error(f"An unexpected error occurred during PDF analysis: {str(e)}")
+        analyze_clicked = st.button("🔍 Analyze PDF", disabled=analyze_disabled, help=analyze_help, use_container_width=True)
+
+    # Stream the analysis below the button row so the live preview gets the full width
+    if analyze_clicked and uploaded_file is not None:
+        try:
+            pdf_analysis = stream_pdf_analysis(uploaded_file)
+            if pdf_analysis is not None:
+                st.session_state.pdf_analysis = pdf_analysis
+                st.success("PDF analyzed successfully!")
+                st.rerun()
+        except requests.exceptions.RequestException as e:
+            st.error(f"Connection error during PDF analysis: {str(e)}")
+        except Exception as e:
+            st.error(f"An unexpected error occurred during PDF analysis: {str(e)}")
 
     # Display analysis result if available
     if st.session_state.pdf_analysis:
@@ -204,18 +326,21 @@ def step2_generate_and_format():
         # Generate & Format Button
         generate_button_label = "✨ Generate & Format Content" if not st.session_state.formatted_content else "🔄 Regenerate & Format Content"
         if st.button(generate_button_label, use_container_width=True, type="primary"):
+            # A deliberate "Regenerate" bypasses the server-side response cache
+            regenerate_params = {"regenerate": "true"} if st.session_state.formatted_content else {}
             with st.spinner("Generating and formatting content... This may take a moment."):
                 try:
                     # 1. Generate Content
-                    combined_input = f"User Intent:\n{st.session_state.user_query}\n\nReference Content:\n{st.session_state.pdf_analysis}"
-                    gen_response = requests.post(
-                        f"{API_URL}/generate-content/",
-                        data=combined_input.encode('utf-8'),
-                        headers={"Content-Type": "text/plain; charset=utf-8"}
-                    )
-                    gen_response.raise_for_status()
-
-                    generated_content = gen_response.json().get("generated_content", "")
+                    if st.session_state.pdf_analysis and st.session_state.document_id:
+                        # The server adds the pages most relevant to the query from its page index
+                        generated_content = stream_generation(
+                            "/generate-content/",
+                            st.session_state.user_query,
+                            {**regenerate_params, "document_id": st.session_state.document_id}
+                        )
+                    else:
+                        combined_input = f"User Intent:\n{st.session_state.user_query}\n\nReference Content:\n{st.session_state.pdf_analysis}"
+                        generated_content = stream_generation("/generate-content/", combined_input, regenerate_params)
                     st.session_state.generated_content = generated_content
 
                     if not generated_content:
@@ -223,14 +348,7 @@ def step2_generate_and_format():
                         st.stop()
 
                     # 2. Format Content
-                    format_response = requests.post(
-                        f"{API_URL}/format-content/",
-                        data=generated_content.encode('utf-8'),
-                        headers={"Content-Type": "text/plain; charset=utf-8"}
-                    )
-                    format_response.raise_for_status()
-
-                    formatted_content = format_response.json().get("formatted_content", "")
+                    formatted_content = stream_generation("/format-content/", generated_content, regenerate_params)
                     st.session_state.formatted_content = formatted_content
 
                     st.success("Content generated and formatted successfully!")
@@ -278,14 +396,8 @@ def step3_optimize_and_finalize():
     if not st.session_state.seo_content and st.session_state.formatted_content:
         with st.spinner("Optimizing content for SEO..."):
             try:
-                response = requests.post(
-                    f"{API_URL}/optimize-seo/",
-                    data=st.session_state.formatted_content.encode('utf-8'),
-                    headers={"Content-Type": "text/plain; charset=utf-8"}
-                )
-                response.raise_for_status()
-
-                seo_content = response.json().get("seo_suggestions", "")
+                seo_params = {"regenerate": "true"} if st.session_state.pop('force_seo_regenerate', False) else {}
+                seo_content = stream_generation("/optimize-seo/", st.session_state.formatted_content, seo_params)
                 st.session_state.seo_content = seo_content
                 st.success("Content optimized for SEO!")
                 st.rerun()
@@ -317,6 +429,7 @@ def step3_optimize_and_finalize():
         with col1:
             if st.button("🔄 Re-optimize SEO", use_container_width=True):
                 st.session_state.seo_content = ""
+                st.session_state.force_seo_regenerate = True
                 st.rerun()
 
         with col2:
@@ -346,43 +459,55 @@ def step3_optimize_and_finalize():
                 st.download_button(
                     label="📥 Download Image",
                     data=st.session_state.generated_image,
-                    file_name="linkedin_post_image.png",
-                    mime="image/png",
+                    file_name="linkedin_post_image.jpg",
+                    mime="image/jpeg",
                     use_container_width=True
                 )
                 if st.button("🔄 Regenerate Image", use_container_width=True):
                     del st.session_state.generated_image
+                    st.session_state.force_image_regenerate = True
                     st.rerun()
 
         else:
-            generate_image_button = st.button("🎨 Generate Image", help="Generate an image based on the post content")
+            pending_job_id = st.session_state.get('image_job_id')
+            size_label = st.selectbox("Image size", list(IMAGE_SIZE_OPTIONS), key="image_size_label")
+            if pending_job_id:
+                generate_image_button = st.button("⏳ Check Image Status", help="Resume waiting for the image that is being generated")
+            else:
+                generate_image_button = st.button("🎨 Generate Image", help="Generate an image based on the post content")
 
             if generate_image_button:
-                with st.spinner("Generating image... This can take some time."):
-                    try:
+                try:
+                    if not pending_job_id:
                         combined_content = f"Original Query: {st.session_state.user_query}\n\nPost Content: {st.session_state.seo_content}"
 
-                        image_response = requests.post(
-                            f"{API_URL}/generate-image/",
+                        image_params = {}
+                        if st.session_state.pop('force_image_regenerate', False):
+                            # Stored images are keyed by prompt and seed, so a new seed yields a new image
+                            image_params = {"regenerate": "true", "seed": random.randint(1, 2**31 - 1)}
+                        submit_response = requests.post(
+                            f"{API_URL}/image-jobs/",
+                            params=image_params,
                             data=combined_content.encode('utf-8'),
                             headers={"Content-Type": "text/plain; charset=utf-8"},
-                            timeout=120
+                            timeout=10
                         )
-                        image_response.raise_for_status()
-
-                        if image_response.content and image_response.headers.get('content-type', '').startswith('image/'):
-                            st.session_state.generated_image = image_response.content
-                            st.success("Image generated successfully!")
-                            st.rerun()
-                        else:
-                            st.error(f"Image generation failed. Server response: {image_response.text}")
-
-                    except requests.exceptions.Timeout:
-                        st.error("Image generation timed out. The process took too long.")
-                    except requests.exceptions.RequestException as e:
-                        st.error(f"Connection error during image generation: {str(e)}")
-                    except Exception as e:
-                        st.error(f"An unexpected error occurred during image generation: {str(e)}")
+                        submit_response.raise_for_status()
+                        pending_job_id = submit_response.json()["job_id"]
+                        # Keep the id so the job can be resumed after a rerun or a timeout
+                        st.session_state.image_job_id = pending_job_id
+
+                    image_bytes = wait_for_image_job(pending_job_id, IMAGE_SIZE_OPTIONS[size_label])
+                    if image_bytes:
+                        st.session_state.generated_image = image_bytes
+                        del st.session_state.image_job_id
+                        st.success("Image generated successfully!")
+                        st.rerun()
+
+                except requests.exceptions.RequestException as e:
+                    st.error(f"Connection error during image generation: {str(e)}")
+                except Exception as e:
+                    st.error(f"An unexpected error occurred during image generation: {str(e)}")
 
         st.divider()
         st.success("🎉 Your LinkedIn post is ready!")
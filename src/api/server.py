@@ -1,22 +1,46 @@
 import os
 import sys
-import shutil
-import tempfile
+import json
+import math
+import re
+import time
+import uuid
 import fitz  # PyMuPDF
 import uvicorn
-import io  # Add io for image streaming
-from fastapi import FastAPI, File, UploadFile, HTTPException, Body
-from fastapi.responses import JSONResponse, StreamingResponse  # Add StreamingResponse
-from PIL import Image  # Add PIL Image
+from fastapi import FastAPI, File, UploadFile, HTTPException, Body, Query, Depends, Header
+from fastapi.responses import JSONResponse, StreamingResponse, FileResponse, Response, PlainTextResponse  # Add StreamingResponse
+from starlette.routing import Match
+from pydantic import BaseModel, Field
+from typing import List, Optional
 
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 if project_root not in sys.path:
     sys.path.append(project_root)
 
 try:
-    from src.core.generators.gemini_generator import ask_gemini_about_image
-    from src.core.generators.text_generator import generate_text_response
-    from src.core.generators.image_generator import generate_image_from_prompt  # Add image generator import
+    from src.core.generators.text_generator import generate_text_response_async, stream_text_response_async
+    from src.core.generators.executor import run_blocking, shutdown_generator_executor
+    from src.core.generators.client_registry import init_clients
+    from src.core.generators.resilience import UpstreamUnavailableError, upstream_stats
+    from src.core.generators.single_flight import single_flight_stats
+    from src.core.cache.response_cache import all_cache_stats, make_cache_key
+    from src.core.cache.image_store import get_or_generate_image, get_image_store, etag_for
+    from src.core.pdf.pdf_analyzer import (
+        open_pdf_pages, iter_page_descriptions, EmptyPDFError, SOURCE_TEXT, SOURCE_CACHE, SOURCE_VISION
+    )
+    from src.core.pdf.render_options import build_render_options
+    from src.core.utils.stage_timing import start_request_timings, server_timing_header
+    from src.core.utils.metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_FLIGHT, render_metrics
+    from src.core.utils.structured_logging import configure_logging, shutdown_logging, get_logger, set_request_id
+    from src.core.utils.image_output import build_output_options, is_original_png
+    from src.core.pipeline.post_pipeline import (
+        run_post_pipeline, validate_pipeline_options, build_generation_input, PipelineStageError, STAGES, MODE_STAGED
+    )
+    from src.core.pipeline.batch_runner import run_batch, iter_batch_results
+    from src.core.pipeline.scheduler import get_scheduler
+    from src.core.pipeline.condense import condense_generation_input
+    from src.core.retrieval.page_index import get_page_index, DocumentNotFoundError
+    from src.core.jobs.image_jobs import get_image_job_queue, public_job_view, STATUS_SUCCEEDED, STATUS_FAILED
     from src.core.prompts.content_creation_prompt import content_prompt
     from src.core.prompts.formatter_prompt import formatting_prompt
     from src.core.prompts.seo_prompt import seo_prompt
@@ -26,69 +50,187 @@ except ImportError as e:
     print(f"Error importing modules: {e}")
     sys.exit(1)
 
+IMAGE_KEY_PATTERN = re.compile(r"[0-9a-f]{64}")
+# Client-supplied request ids are accepted if they are short and printable
+REQUEST_ID_PATTERN = re.compile(r"[A-Za-z0-9._-]{1,64}")
+
+logger = get_logger("api")
+
 app = FastAPI(
     title="LinkGenix API",
     description="API for processing documents and generating insights.",
     version="0.1.0"
 )
 
-@app.post("/analyze-pdf/")
-async def analyze_pdf(file: UploadFile = File(...)):
+def _route_label(request) -> str:
+    # The route template keeps the metric labels bounded (/images/{key}, not every key)
+    for route in app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+@app.middleware("http")
+async def add_server_timing(request, call_next):
+    """
+    Reports where a request spent its time in a Server-Timing header (executor wait,
+    rate-limit wait, model calls, rendering, encoding, ...) and records the request in
+    the /metrics latency histogram. Streamed responses only include the stages
+    finished before the first byte.
+
+    Every log record of the request carries its id: the X-Request-ID header if the
+    client sent a valid one, otherwise a new id, returned in the same header.
+    """
+    request_id = request.headers.get("X-Request-ID", "")
+    if not REQUEST_ID_PATTERN.fullmatch(request_id):
+        request_id = uuid.uuid4().hex
+    set_request_id(request_id)
+
+    endpoint = _route_label(request)
+    timings = start_request_timings()
+    started = time.perf_counter()
+    status = 500
+    try:
+        with HTTP_REQUESTS_IN_FLIGHT.track(endpoint=endpoint):
+            response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - started
+        HTTP_REQUEST_DURATION.observe(elapsed, endpoint=endpoint, method=request.method, status=status)
+    timings["total"] = elapsed
+    response.headers["Server-Timing"] = server_timing_header(timings)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+@app.on_event("startup")
+async def startup_generators():
+    """Configures logging and the shared model clients once before the first request."""
+    configure_logging()
+    try:
+        init_clients()
+    except Exception as e:
+        logger.warning("Failed to initialize model clients at startup: %s", e)
+
+    recovered = get_image_job_queue().recover()
+    if recovered:
+        logger.info("Re-queued %d unfinished image jobs.", recovered)
+
+@app.on_event("shutdown")
+async def shutdown_generators():
+    """Releases the dedicated generator thread pool when the API stops."""
+    shutdown_generator_executor(wait=False)
+    # Unfinished image jobs stay in the job store and are re-queued on the next start
+    get_image_job_queue().shutdown(wait=False)
+    shutdown_logging()
+
+def _upstream_unavailable(error: UpstreamUnavailableError) -> HTTPException:
+    """Maps a rate-limited or degraded upstream to 503, with Retry-After when known."""
+    headers = {"Retry-After": str(max(1, math.ceil(error.retry_after)))} if error.retry_after else None
+    return HTTPException(status_code=503, detail=str(error), headers=headers)
+
+def pdf_analysis_options(
+    regenerate: bool = Query(False, description="Ignore cached page descriptions and re-analyze every page."),
+    text_fast_path: bool = Query(config.PDF_TEXT_FAST_PATH, description="Describe text-only pages from their text layer instead of the vision model."),
+    resolution: str = Query(config.PDF_RESOLUTION_POLICY, description='Rasterization policy: "fixed", "long_edge" or "auto".'),
+    dpi: int = Query(config.DEFAULT_PDF_DPI, description='Render DPI for the "fixed" policy.'),
+    long_edge: int = Query(config.PDF_TARGET_LONG_EDGE, description='Longest side in pixels for the "long_edge" and "auto" policies.'),
+    image_format: str = Query(config.PDF_IMAGE_FORMAT, description='Encoding of page images sent to Gemini: "png", "jpeg" or "webp".'),
+    image_quality: int = Query(config.PDF_IMAGE_QUALITY, description="JPEG/WebP quality (1-100)."),
+    batch_size: int = Query(config.PDF_BATCH_SIZE, ge=1, description="Pages packed into one Gemini request (capped by the token budget).")
+) -> dict:
+    """Query parameters shared by the PDF analysis endpoints."""
+    try:
+        render_options = build_render_options(resolution, dpi, long_edge, image_format, image_quality)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    return {
+        "use_cache": not regenerate,
+        "text_fast_path": text_fast_path,
+        "render_options": render_options,
+        "batch_size": batch_size,
+    }
+
+def image_output_options(
+    format: str = Query(config.IMAGE_OUTPUT_FORMAT, description='Output encoding: "png", "jpeg" or "webp".'),
+    quality: int = Query(config.IMAGE_OUTPUT_QUALITY, description="JPEG/WebP quality (1-100)."),
+    size: str = Query(config.IMAGE_OUTPUT_SIZE, description='Size preset: "original", "linkedin" (1200x627), "square" (1080x1080) or "thumbnail" (320x320).'),
+    width: Optional[int] = Query(None, description="Target width in pixels (overrides the preset)."),
+    height: Optional[int] = Query(None, description="Target height in pixels (overrides the preset).")
+) -> dict:
+    """Query parameters shared by the endpoints that return images."""
+    try:
+        return build_output_options(format, quality, size, width, height)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+
+async def _stored_image_response(key: str, options: dict, headers: dict = None):
     """
-    Accepts a PDF file, converts each page to an image,
-    analyzes each image using Gemini, and returns the combined description.
+    Streams a stored image from disk in the requested format and size. The variant is
+    encoded in the generator executor on first use and reused afterwards.
     """
-    with tempfile.TemporaryDirectory() as temp_dir:
-        pdf_path = os.path.join(temp_dir, file.filename)
-        images_dir = os.path.join(temp_dir, "images")
-        os.makedirs(images_dir, exist_ok=True)
+    try:
+        path, mime_type, variant_key = await run_blocking(get_image_store().variant, key, options)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Image not found.")
+    return FileResponse(path, media_type=mime_type, headers={"ETag": etag_for(variant_key), **(headers or {})})
 
-        try:
-            with open(pdf_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Failed to save uploaded file: {e}")
-        finally:
-            await file.close()
+async def _open_uploaded_pdf(file: UploadFile, options: dict) -> tuple:
+    """
+    Reads an uploaded PDF into memory and starts rendering its pages.
 
-        all_descriptions = []
-        page_count = 0
+    Returns:
+        (page count, async iterator of rendered pages), see pdf_analyzer.open_pdf_pages.
+    """
+    try:
+        pdf_bytes = await file.read()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to read uploaded file: {e}")
+    finally:
+        await file.close()
 
-        try:
-            doc = fitz.open(pdf_path)
-            page_count = len(doc)
-
-            if page_count == 0:
-                 raise HTTPException(status_code=400, detail="The uploaded PDF has no pages.")
-
-            for i, page in enumerate(doc):
-                image_path = os.path.join(images_dir, f"page_{i+1}.png")
-                pix = page.get_pixmap(dpi=150)
-                pix.save(image_path)
-
-                prompt = f"Describe the content of this document page ({i+1}/{page_count}). Focus on the main text, figures, and layout.summarize it and provide all key information."
-                try:
-                    description = ask_gemini_about_image(
-                        image_path=image_path,
-                        text_prompt=prompt,
-                        model_name=config.DEFAULT_GEMINI_FLASH_MODEL
-                    )
-                    if description:
-                        all_descriptions.append(f"--- Page {i+1} ---\n{description}\n")
-                    else:
-                        all_descriptions.append(f"--- Page {i+1} ---\n[No description returned from Gemini]\n")
-                except Exception as gemini_error:
-                    print(f"Error processing page {i+1} with Gemini: {gemini_error}")
-                    all_descriptions.append(f"--- Page {i+1} ---\n[Error analyzing page: {gemini_error}]\n")
-                finally:
-                    pass
-
-            doc.close()
-
-        except fitz.fitz.FileNotFoundError:
-             raise HTTPException(status_code=404, detail="Temporary PDF file not found during processing.")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error processing PDF: {e}")
+    try:
+        return await open_pdf_pages(
+            pdf_bytes,
+            config.DEFAULT_GEMINI_FLASH_MODEL,
+            use_cache=options["use_cache"],
+            text_fast_path=options["text_fast_path"],
+            render_options=options["render_options"],
+            batch_size=options["batch_size"]
+        )
+    except EmptyPDFError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except fitz.FileDataError as e:
+        raise HTTPException(status_code=400, detail=f"The uploaded file is not a valid PDF: {e}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing PDF: {e}")
+
+async def _index_analysis(analysis: str):
+    """Adds an analysis to the page index and returns its document id (None if it can't be indexed)."""
+    try:
+        return (await run_blocking(get_page_index().add_document, analysis))["document_id"]
+    except Exception as e:
+        logger.warning("Failed to index the PDF analysis: %s", e)
+        return None
+
+@app.post("/analyze-pdf/")
+async def analyze_pdf(file: UploadFile = File(...), options: dict = Depends(pdf_analysis_options)):
+    """
+    Accepts a PDF file, converts each page to an image in memory,
+    analyzes the images concurrently using Gemini (bounded by
+    config.PDF_ANALYSIS_CONCURRENCY), and returns the combined description in page order.
+    Text-only pages are described from their text layer, and pages whose fingerprint
+    is already in the page cache are not sent to Gemini again.
+    """
+    page_count, pages = await _open_uploaded_pdf(file, options)
+
+    try:
+        all_descriptions = [None] * page_count
+        sources = {}
+        async for i, description, source in iter_page_descriptions(pages, page_count, options["batch_size"], config.DEFAULT_GEMINI_FLASH_MODEL):
+            all_descriptions[i] = description
+            sources[source] = sources.get(source, 0) + 1
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing PDF: {e}")
 
     combined_text = "\n".join(all_descriptions)
 
@@ -98,13 +240,114 @@ async def analyze_pdf(file: UploadFile = File(...)):
              content={"message": "PDF processed, but no descriptions were generated.", "analysis": ""}
          )
 
-    return JSONResponse(content={"analysis": combined_text})
+    return JSONResponse(content={
+        "analysis": combined_text,
+        "text_pages": sources.get(SOURCE_TEXT, 0),
+        "cached_pages": sources.get(SOURCE_CACHE, 0),
+        "document_id": await _index_analysis(combined_text)
+    })
+
+@app.post("/analyze-pdf/stream/")
+async def analyze_pdf_stream(file: UploadFile = File(...), options: dict = Depends(pdf_analysis_options)):
+    """
+    Streaming variant of /analyze-pdf/. Emits newline-delimited JSON events:
+    one "start" event with the page count as soon as the document is open, one "page"
+    event per page as soon as its description is ready (in completion order; later
+    pages are still rendering meanwhile), and a final "done" event with the page breakdown.
+    """
+    page_count, pages = await _open_uploaded_pdf(file, options)
+
+    async def event_stream():
+        started = time.perf_counter()
+        yield json.dumps({"event": "start", "page_count": page_count}) + "\n"
+
+        completed = 0
+        descriptions = {}
+        sources = {}
+        try:
+            async for i, description, source in iter_page_descriptions(pages, page_count, options["batch_size"], config.DEFAULT_GEMINI_FLASH_MODEL):
+                completed += 1
+                descriptions[i] = description
+                sources[source] = sources.get(source, 0) + 1
+                yield json.dumps({
+                    "event": "page",
+                    "page": i + 1,
+                    "source": source,
+                    "description": description,
+                    "completed": completed,
+                    "page_count": page_count,
+                    "elapsed_seconds": round(time.perf_counter() - started, 3)
+                }) + "\n"
+        except Exception as e:
+            logger.error("Error while streaming PDF analysis: %s", e)
+            yield json.dumps({"event": "error", "detail": f"Error processing PDF: {e}"}) + "\n"
+            return
+
+        yield json.dumps({
+            "event": "done",
+            "completed": completed,
+            "page_count": page_count,
+            "text_pages": sources.get(SOURCE_TEXT, 0),
+            "cached_pages": sources.get(SOURCE_CACHE, 0),
+            "vision_pages": sources.get(SOURCE_VISION, 0),
+            "elapsed_seconds": round(time.perf_counter() - started, 3),
+            "document_id": await _index_analysis("\n".join(descriptions[i] for i in sorted(descriptions)))
+        }) + "\n"
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+async def _stream_text(system_prompt: str, user_prompt: str, regenerate: bool, label: str) -> StreamingResponse:
+    """
+    Streams a text generation as chunked text/plain.
+
+    The first chunk is awaited before the response starts, so missing keys, upstream
+    errors and empty (e.g. safety-blocked) generations still surface as HTTP 500s.
+    """
+    chunks = stream_text_response_async(
+        system_prompt=system_prompt,
+        user_prompt=user_prompt,
+        model_name=config.DEFAULT_GEMINI_PRO_MODEL,
+        use_cache=not regenerate
+    )
+    try:
+        first_chunk = await chunks.__anext__()
+    except StopAsyncIteration:
+        raise HTTPException(status_code=500, detail=f"Failed to {label}. The model returned an empty response or an error occurred.")
+    except UpstreamUnavailableError as ue:
+        raise _upstream_unavailable(ue)
+    except ValueError as ve:
+        raise HTTPException(status_code=500, detail=str(ve))
+    except Exception as e:
+        logger.error("Error while starting to %s: %s", label, e)
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred while trying to {label}: {e}")
+
+    async def body():
+        yield first_chunk
+        try:
+            async for chunk in chunks:
+                yield chunk
+        except Exception as e:
+            # Headers are already sent; report the failure in-band
+            logger.error("Error while streaming (%s): %s", label, e)
+            yield f"\n\n[Generation interrupted: {e}]"
+
+    return StreamingResponse(body(), media_type="text/plain; charset=utf-8")
 
 @app.post("/generate-content/")
-async def create_linkedin_post(user_input_string: str = Body(..., media_type="text/plain")):
+async def create_linkedin_post(
+    user_input_string: str = Body(..., media_type="text/plain"),
+    regenerate: bool = Query(False, description="Bypass the response cache and force a fresh generation."),
+    stream: bool = Query(False, description="Stream the generated text as it is produced (chunked text/plain) instead of returning JSON."),
+    condense: bool = Query(True, description="Summarize a \"Reference Content\" section that is over the token budget before generating."),
+    document_id: Optional[str] = Query(None, description="Id of an indexed PDF analysis; the body is then the user intent and the most relevant pages are added as reference content."),
+    top_k: int = Query(config.RETRIEVAL_TOP_K, ge=1, description="Number of pages retrieved with document_id.")
+):
     """
     Generates content based on a user-provided input string and a predefined system prompt.
     The input string should contain all necessary details for the content generation.
+    With document_id, the pages of that analysis most relevant to the input are
+    appended as reference content. A long "Reference Content" section (e.g. a PDF
+    analysis) is condensed first.
     """
     # The received string is the user prompt
     full_user_prompt = user_input_string
@@ -113,13 +356,32 @@ async def create_linkedin_post(user_input_string: str = Body(..., media_type="te
     if not full_user_prompt:
         raise HTTPException(status_code=400, detail="Input string cannot be empty.")
 
+    if document_id:
+        try:
+            reference = await run_blocking(get_page_index().retrieve_reference, document_id, full_user_prompt, top_k)
+        except DocumentNotFoundError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        full_user_prompt = build_generation_input(full_user_prompt, reference)
+
+    if condense:
+        try:
+            full_user_prompt = await condense_generation_input(full_user_prompt, use_cache=not regenerate)
+        except UpstreamUnavailableError as ue:
+            raise _upstream_unavailable(ue)
+        except ValueError as ve:
+            raise HTTPException(status_code=500, detail=str(ve))
+
+    if stream:
+        return await _stream_text(content_prompt, full_user_prompt, regenerate, "generate content")
+
     try:
         # Use the predefined content_prompt as the system prompt
         # and the received string as the user prompt
-        generated_content = generate_text_response(
+        generated_content = await generate_text_response_async(
             system_prompt=content_prompt,
             user_prompt=full_user_prompt,
-            model_name=config.DEFAULT_GEMINI_PRO_MODEL
+            model_name=config.DEFAULT_GEMINI_PRO_MODEL,
+            use_cache=not regenerate
         )
 
         if generated_content:
@@ -129,14 +391,20 @@ async def create_linkedin_post(user_input_string: str = Body(..., media_type="te
             # Handle cases where the generator returns None (e.g., safety filters, errors)
             raise HTTPException(status_code=500, detail="Failed to generate content. The model returned an empty response or an error occurred.")
 
+    except UpstreamUnavailableError as ue:
+        raise _upstream_unavailable(ue)
     except ValueError as ve:
          raise HTTPException(status_code=500, detail=str(ve))
     except Exception as e:
-        print(f"Error during content generation: {e}")
+        logger.error("Error during content generation: %s", e)
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred during content generation: {e}")
 
 @app.post("/format-content/")
-async def format_generated_content(raw_content: str = Body(..., media_type="text/plain")):
+async def format_generated_content(
+    raw_content: str = Body(..., media_type="text/plain"),
+    regenerate: bool = Query(False, description="Bypass the response cache and force a fresh generation."),
+    stream: bool = Query(False, description="Stream the generated text as it is produced (chunked text/plain) instead of returning JSON.")
+):
     """
     Formats the provided raw content string using a predefined formatting prompt
     and the text generation model.
@@ -145,13 +413,17 @@ async def format_generated_content(raw_content: str = Body(..., media_type="text
     if not raw_content:
         raise HTTPException(status_code=400, detail="Input content string cannot be empty.")
 
+    if stream:
+        return await _stream_text(formatting_prompt, raw_content, regenerate, "format content")
+
     try:
         # Use the formatting_prompt as the system prompt
         # and the received raw_content as the user prompt
-        formatted_content = generate_text_response(
+        formatted_content = await generate_text_response_async(
             system_prompt=formatting_prompt,
             user_prompt=raw_content,
-            model_name=config.DEFAULT_GEMINI_PRO_MODEL
+            model_name=config.DEFAULT_GEMINI_PRO_MODEL,
+            use_cache=not regenerate
         )
 
         if formatted_content:
@@ -161,14 +433,20 @@ async def format_generated_content(raw_content: str = Body(..., media_type="text
             # Handle cases where the generator returns None
             raise HTTPException(status_code=500, detail="Failed to format content. The model returned an empty response or an error occurred.")
 
+    except UpstreamUnavailableError as ue:
+        raise _upstream_unavailable(ue)
     except ValueError as ve:
          raise HTTPException(status_code=500, detail=str(ve))
     except Exception as e:
-        print(f"Error during content formatting: {e}")
+        logger.error("Error during content formatting: %s", e)
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred during content formatting: {e}")
 
 @app.post("/optimize-seo/")
-async def optimize_content_seo(formatted_content: str = Body(..., media_type="text/plain")):
+async def optimize_content_seo(
+    formatted_content: str = Body(..., media_type="text/plain"),
+    regenerate: bool = Query(False, description="Bypass the response cache and force a fresh generation."),
+    stream: bool = Query(False, description="Stream the generated text as it is produced (chunked text/plain) instead of returning JSON.")
+):
     """
     Analyzes the provided formatted content string using an SEO prompt
     and the text generation model to suggest SEO improvements.
@@ -177,13 +455,17 @@ async def optimize_content_seo(formatted_content: str = Body(..., media_type="te
     if not formatted_content:
         raise HTTPException(status_code=400, detail="Input formatted content string cannot be empty.")
 
+    if stream:
+        return await _stream_text(seo_prompt, formatted_content, regenerate, "generate SEO suggestions")
+
     try:
         # Use the seo_prompt as the system prompt
         # and the received formatted_content as the user prompt
-        seo_suggestions = generate_text_response(
+        seo_suggestions = await generate_text_response_async(
             system_prompt=seo_prompt,
             user_prompt=formatted_content,
-            model_name=config.DEFAULT_GEMINI_PRO_MODEL
+            model_name=config.DEFAULT_GEMINI_PRO_MODEL,
+            use_cache=not regenerate
         )
 
         if seo_suggestions:
@@ -193,51 +475,253 @@ async def optimize_content_seo(formatted_content: str = Body(..., media_type="te
             # Handle cases where the generator returns None
             raise HTTPException(status_code=500, detail="Failed to generate SEO suggestions. The model returned an empty response or an error occurred.")
 
+    except UpstreamUnavailableError as ue:
+        raise _upstream_unavailable(ue)
     except ValueError as ve:
          raise HTTPException(status_code=500, detail=str(ve))
     except Exception as e:
-        print(f"Error during SEO optimization: {e}")
+        logger.error("Error during SEO optimization: %s", e)
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred during SEO optimization: {e}")
 
+class PipelineRequest(BaseModel):
+    user_query: str = Field(..., description="What the post should be about.")
+    reference_content: str = Field("", description="Optional reference text, e.g. the /analyze-pdf/ analysis.")
+    stages: Optional[List[str]] = Field(None, description=f"Stages to run, any of {list(STAGES)}. Defaults to all.")
+    mode: str = Field(MODE_STAGED, description='"staged" (one model call per stage) or "fused" (one call for all three stages).')
+    regenerate: bool = Field(False, description="Bypass the response cache and force fresh generations.")
+    condense: bool = Field(True, description="Summarize reference_content first if it is over the token budget.")
+    document_id: Optional[str] = Field(None, description="Id of an indexed PDF analysis whose most relevant pages are added to reference_content.")
+    top_k: Optional[int] = Field(None, ge=1, description="Number of pages retrieved with document_id (defaults to RETRIEVAL_TOP_K).")
+
+@app.post("/pipeline/")
+async def run_pipeline(request: PipelineRequest):
+    """
+    Runs generate -> format -> SEO server-side in one request and returns every
+    intermediate artifact, so the client doesn't ship each text back and forth.
+    """
+    if not request.user_query:
+        raise HTTPException(status_code=400, detail="user_query cannot be empty.")
+    try:
+        validate_pipeline_options(request.stages, request.mode)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+
+    try:
+        result = await run_post_pipeline(
+            user_query=request.user_query,
+            reference_content=request.reference_content,
+            stages=request.stages,
+            mode=request.mode,
+            use_cache=not request.regenerate,
+            condense=request.condense,
+            document_id=request.document_id,
+            top_k=request.top_k
+        )
+        return JSONResponse(content=result)
+
+    except DocumentNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except PipelineStageError as stage_error:
+        raise HTTPException(status_code=500, detail=f"Pipeline failed at stage '{stage_error.stage}': {stage_error}")
+    except UpstreamUnavailableError as ue:
+        raise _upstream_unavailable(ue)
+    except ValueError as ve:
+        raise HTTPException(status_code=500, detail=str(ve))
+    except Exception as e:
+        logger.error("Error during pipeline execution: %s", e)
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred during the pipeline: {e}")
+
+class BatchJob(BaseModel):
+    id: Optional[str] = Field(None, description="Caller-defined identifier echoed in the result (defaults to the job index).")
+    user_query: str = Field(..., description="What the post should be about.")
+    reference_content: str = Field("", description="Optional reference text, e.g. a PDF analysis.")
+    stages: Optional[List[str]] = Field(None, description=f"Stages to run, any of {list(STAGES)}. Defaults to all.")
+    mode: str = Field(MODE_STAGED, description='"staged" or "fused".')
+    model_name: Optional[str] = Field(None, description="Gemini model for the job, one of BATCH_ALLOWED_MODELS (defaults to DEFAULT_GEMINI_PRO_MODEL). Each model has its own concurrency limit.")
+    document_id: Optional[str] = Field(None, description="Id of an indexed PDF analysis whose most relevant pages are added to reference_content.")
+    top_k: Optional[int] = Field(None, ge=1, description="Number of pages retrieved with document_id.")
+
+class BatchRequest(BaseModel):
+    jobs: List[BatchJob] = Field(..., description="The generation jobs.")
+    regenerate: bool = Field(False, description="Bypass the response cache for every job.")
+    stream: bool = Field(False, description="Stream per-job results as NDJSON as they complete instead of one aggregated payload.")
+
+@app.post("/batch/generate/")
+async def batch_generate(request: BatchRequest):
+    """
+    Runs many pipeline jobs concurrently under the global and per-model concurrency
+    limits, reporting a status per job. Results are either streamed as they complete
+    (NDJSON) or returned together once every job has finished.
+    """
+    if not request.jobs:
+        raise HTTPException(status_code=400, detail="jobs cannot be empty.")
+    if len(request.jobs) > config.BATCH_MAX_JOBS:
+        raise HTTPException(status_code=400, detail=f"A batch can contain at most {config.BATCH_MAX_JOBS} jobs.")
+    for i, job in enumerate(request.jobs):
+        if not job.user_query:
+            raise HTTPException(status_code=400, detail=f"Job {job.id or i}: user_query cannot be empty.")
+        try:
+            validate_pipeline_options(job.stages, job.mode)
+        except ValueError as ve:
+            raise HTTPException(status_code=400, detail=f"Job {job.id or i}: {ve}")
+        if job.model_name is not None and job.model_name not in config.BATCH_ALLOWED_MODELS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Job {job.id or i}: unknown model '{job.model_name}'. Choose one of: {', '.join(config.BATCH_ALLOWED_MODELS)}."
+            )
+
+    jobs = [job.dict() for job in request.jobs]
+
+    if request.stream:
+        async def event_stream():
+            async for item in iter_batch_results(jobs, use_cache=not request.regenerate):
+                yield json.dumps(item) + "\n"
+        return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+    return JSONResponse(content=await run_batch(jobs, use_cache=not request.regenerate))
+
 @app.post("/generate-image/")
-async def generate_image_endpoint(input_text: str = Body(..., media_type="text/plain")):
+async def generate_image_endpoint(
+    input_text: str = Body(..., media_type="text/plain"),
+    regenerate: bool = Query(False, description="Bypass the response cache when generating the image prompt."),
+    seed: Optional[int] = Query(None, description="Image generation seed. Pass a new value to get a different image for the same text."),
+    output: dict = Depends(image_output_options)
+):
     """
     Generates an image prompt based on input text and then generates an image.
+    Images are stored by a hash of (image prompt, model, seed), so repeating a request
+    returns the stored PNG without calling the image model again.
     """
     if not input_text:
         raise HTTPException(status_code=400, detail="Input text cannot be empty.")
 
     try:
         # 1. Generate the image prompt using the text generator
-        generated_image_prompt = generate_text_response(
+        generated_image_prompt = await generate_text_response_async(
             system_prompt=image_prompt,
             user_prompt=input_text,
-            model_name=config.DEFAULT_GEMINI_PRO_MODEL  # Or choose another suitable model
+            model_name=config.DEFAULT_GEMINI_PRO_MODEL,  # Or choose another suitable model
+            use_cache=not regenerate
         )
 
         if not generated_image_prompt:
             raise HTTPException(status_code=500, detail="Failed to generate image prompt.")
 
-        # 2. Generate the image using the generated prompt
-        generated_image: Image.Image = generate_image_from_prompt(generated_image_prompt)
-
-        if not generated_image:
-             raise HTTPException(status_code=500, detail="Failed to generate image.")
+        # 2. Fetch the image from the store, generating it on a miss
+        key = await run_blocking(get_or_generate_image, generated_image_prompt, seed)
 
-        # 3. Prepare the image for response
-        img_byte_arr = io.BytesIO()
-        generated_image.save(img_byte_arr, format='PNG')  # Save image to buffer
-        img_byte_arr.seek(0)  # Go to the start of the buffer
-
-        return StreamingResponse(img_byte_arr, media_type="image/png")
+        # 3. Deliver it in the requested format and size
+        return await _stored_image_response(key, output, headers={"X-Image-URL": f"/images/{key}"})
 
     except HTTPException as http_exc:
         # Re-raise HTTPExceptions directly
         raise http_exc
+    except UpstreamUnavailableError as ue:
+        raise _upstream_unavailable(ue)
     except Exception as e:
-        print(f"Error during image generation endpoint processing: {e}")
+        logger.error("Error during image generation endpoint processing: %s", e)
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {e}")
 
+@app.get("/images/{key}")
+async def get_stored_image(key: str, if_none_match: Optional[str] = Header(None),
+                           output: dict = Depends(image_output_options)):
+    """
+    Returns a stored image by its content key, in the requested format and size.
+    The bytes behind a key and options never change, so clients may cache the
+    response forever and revalidate with If-None-Match.
+    """
+    if not IMAGE_KEY_PATTERN.fullmatch(key):
+        raise HTTPException(status_code=404, detail="Image not found.")
+
+    cache_headers = {"Cache-Control": "public, max-age=31536000, immutable"}
+    variant_key = key if is_original_png(output) else make_cache_key(key, **output)
+    etag = etag_for(variant_key)
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers={"ETag": etag, **cache_headers})
+
+    return await _stored_image_response(key, output, headers=cache_headers)
+
+@app.post("/image-jobs/", status_code=202)
+async def submit_image_job(
+    input_text: str = Body(..., media_type="text/plain"),
+    regenerate: bool = Query(False, description="Bypass the response cache when generating the image prompt."),
+    seed: Optional[int] = Query(None, description="Image generation seed. Pass a new value to get a different image for the same text.")
+):
+    """
+    Queues an image generation job (image prompt + image) and returns its id immediately.
+    Poll /image-jobs/{job_id} for the status and fetch the PNG from /image-jobs/{job_id}/result
+    (or from the job's image_url).
+    """
+    if not input_text:
+        raise HTTPException(status_code=400, detail="Input text cannot be empty.")
+
+    queue = get_image_job_queue()
+    job_id = await run_blocking(queue.submit, input_text, seed=seed, regenerate=regenerate)
+    return JSONResponse(status_code=202, content=public_job_view(await run_blocking(queue.store.get, job_id)))
+
+@app.get("/image-jobs/{job_id}")
+async def get_image_job(job_id: str):
+    """Returns the status of an image job."""
+    job = await run_blocking(get_image_job_queue().store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Image job not found.")
+    return JSONResponse(content=public_job_view(job))
+
+@app.get("/image-jobs/{job_id}/result")
+async def get_image_job_result(job_id: str, output: dict = Depends(image_output_options)):
+    """Returns the generated image of a finished image job, in the requested format and size."""
+    job = await run_blocking(get_image_job_queue().store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Image job not found.")
+    if job["status"] == STATUS_FAILED:
+        raise HTTPException(status_code=500, detail=f"Image job failed: {job['error']}")
+    if job["status"] != STATUS_SUCCEEDED or not job["image_key"]:
+        raise HTTPException(status_code=409, detail=f"Image job is not finished yet (status: {job['status']}).")
+    return await _stored_image_response(job["image_key"], output)
+
+@app.post("/documents/")
+async def index_document(analysis: str = Body(..., media_type="text/plain")):
+    """
+    Indexes an /analyze-pdf/ analysis (its "--- Page N ---" sections) for retrieval,
+    e.g. one saved from an earlier session. Indexing the same analysis twice returns
+    the same document id.
+    """
+    try:
+        return await run_blocking(get_page_index().add_document, analysis)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+
+@app.get("/documents/{document_id}/search")
+async def search_document(
+    document_id: str,
+    query: str = Query(..., min_length=1, description="Text to rank the pages against, e.g. the user intent."),
+    top_k: int = Query(config.RETRIEVAL_TOP_K, ge=1, description="Number of pages to return.")
+):
+    """Returns the pages of an indexed analysis most relevant to query, best first."""
+    try:
+        results = await run_blocking(get_page_index().search, document_id, query, top_k)
+    except DocumentNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"document_id": document_id, "results": results}
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Returns cache hit/miss counters and the upstream calls saved by request coalescing."""
+    return {"caches": all_cache_stats(), "images": get_image_store().stats(), "coalescing": single_flight_stats()}
+
+@app.get("/upstream/stats")
+async def upstream_status():
+    """
+    Returns rate limit, retry and circuit breaker state for each model upstream, and the
+    limits and calls in flight of the batch scheduler.
+    """
+    return {"upstreams": upstream_stats(), "batch_scheduler": get_scheduler().stats()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Exposes request, stage, token and upstream error metrics in the Prometheus text format."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/")
 async def root():
     """Basic root endpoint."""
@@ -0,0 +1,152 @@
+import os
+import sys
+import threading
+import uuid
+
+from PIL import Image
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+import config
+from src.core.cache.response_cache import make_cache_key
+from src.core.generators.image_generator import generate_image_from_prompt
+from src.core.utils.image_encoding import encode_image, IMAGE_FORMATS
+from src.core.utils.image_output import is_original_png, resize_image
+from src.core.utils.stage_timing import stage_timer
+
+def image_key(image_prompt: str, model_name: str, seed: int, **params) -> str:
+    """
+    Content address of a generated image: a hash of everything that determines its pixels.
+
+    Args:
+        image_prompt: The prompt sent to the image model.
+        model_name: The image model.
+        seed: The generation seed (vary it to get a different image for the same prompt).
+        **params: Any other generation parameters.
+
+    Returns:
+        A SHA-256 hex digest.
+    """
+    return make_cache_key("image", image_prompt, model_name, seed, **params)
+
+class ImageStore:
+    """
+    Local content-addressed store of generated PNGs, laid out as <root>/<key[:2]>/<key>.png.
+    Resized or re-encoded variants are kept next to the original as
+    <key>.<variant key>.<ext>. Writes are atomic, so a file that exists is always complete.
+    """
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(root_dir, exist_ok=True)
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.root_dir, key[:2], f"{key}.png")
+
+    def has(self, key: str) -> bool:
+        found = os.path.exists(self.path_for(key))
+        with self._lock:
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return found
+
+    def put(self, key: str, image: Image.Image) -> str:
+        """Stores an image as PNG under key and returns its path."""
+        path = self.path_for(key)
+        if os.path.exists(path):
+            # A coalesced caller already stored the same image
+            return path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{uuid.uuid4().hex}.part"
+        image.save(temp_path, format="PNG")
+        os.replace(temp_path, path)
+        return path
+
+    def variant(self, key: str, options: dict) -> tuple:
+        """
+        Returns the stored image in the requested output format and size, encoding and
+        caching the variant on first use. Blocking; run it in an executor.
+
+        Args:
+            key: The original image key.
+            options: Output options from image_output.build_output_options.
+
+        Returns:
+            A (path, mime_type, variant_key) tuple. For the original PNG, variant_key is key.
+
+        Raises:
+            FileNotFoundError: If the original image is not in the store.
+        """
+        source_path = self.path_for(key)
+        if not os.path.exists(source_path):
+            raise FileNotFoundError(f"Image {key} is not in the store.")
+        if is_original_png(options):
+            return source_path, IMAGE_FORMATS["png"][1], key
+
+        variant_key = make_cache_key(key, **options)
+        extension = options["image_format"]
+        path = os.path.join(os.path.dirname(source_path), f"{key}.{variant_key[:16]}.{extension}")
+        mime_type = IMAGE_FORMATS[extension][1]
+        if not os.path.exists(path):
+            with stage_timer("image_encode"), Image.open(source_path) as source:
+                data, mime_type = encode_image(resize_image(source, options), extension, options["quality"])
+            temp_path = f"{path}.{uuid.uuid4().hex}.part"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        return path, mime_type, variant_key
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "root_dir": self.root_dir}
+
+def etag_for(key: str) -> str:
+    """Strong ETag for a stored image; the key already identifies the exact bytes."""
+    return f'"{key}"'
+
+def get_or_generate_image(image_prompt: str, seed: int = None) -> str:
+    """
+    Returns the key of the image for (image_prompt, model, seed), generating and
+    storing it only if the store doesn't have it yet.
+
+    Args:
+        image_prompt: The prompt sent to the image model.
+        seed: The generation seed (defaults to config.DEFAULT_IMAGE_SEED).
+
+    Returns:
+        The image key; the PNG is at get_image_store().path_for(key).
+
+    Raises:
+        RuntimeError: If the image model returns nothing.
+    """
+    seed = config.DEFAULT_IMAGE_SEED if seed is None else seed
+    key = image_key(image_prompt, config.DEFAULT_IMAGE_MODEL, seed)
+    store = get_image_store()
+    if store.has(key):
+        return key
+
+    generated_image = generate_image_from_prompt(image_prompt, seed=seed)
+    if not generated_image:
+        raise RuntimeError("Failed to generate image.")
+    with stage_timer("image_store_write"):
+        store.put(key, generated_image)
+    return key
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_image_store() -> ImageStore:
+    """Returns the process-wide image store configured from config.py."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ImageStore(config.IMAGE_STORE_DIR)
+    return _store
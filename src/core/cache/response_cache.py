@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+import config
+
+def make_cache_key(*parts, **settings) -> str:
+    """
+    Builds a content-addressed cache key from the given inputs.
+
+    Args:
+        *parts: Positional inputs (prompts, model name, ...) that define the request.
+        **settings: Generation settings that change the output (temperature, ...).
+
+    Returns:
+        A SHA-256 hex digest of the canonical JSON encoding of the inputs.
+    """
+    payload = json.dumps({"parts": parts, "settings": settings}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """
+    Two-tier string cache: a bounded in-memory LRU with TTL, backed by an
+    optional SQLite file that survives restarts. Safe to share between threads.
+    """
+
+    def __init__(self, namespace: str, max_entries: int = 1024, ttl_seconds: float = 86400, db_path: str = None):
+        """
+        Args:
+            namespace: Logical name of the cache; entries of different namespaces never collide.
+            max_entries: Maximum number of entries kept in memory.
+            ttl_seconds: How long an entry stays valid (0 or less disables expiry).
+            db_path: Path to the SQLite file for the persistent tier, or None to disable it.
+        """
+        self.namespace = namespace
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, created_at REAL NOT NULL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            self._db.commit()
+
+    def _is_expired(self, created_at: float) -> bool:
+        return self.ttl_seconds > 0 and time.time() - created_at > self.ttl_seconds
+
+    def _remember(self, key: str, value: str, created_at: float):
+        # Caller must hold self._lock
+        self._entries[key] = (value, created_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key: str):
+        """
+        Looks up a cached value.
+
+        Returns:
+            The cached string, or None on a miss or an expired entry.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if not self._is_expired(created_at):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                    (self.namespace, key)
+                ).fetchone()
+                if row is not None:
+                    value, created_at = row
+                    if not self._is_expired(created_at):
+                        self._remember(key, value, created_at)
+                        self.hits += 1
+                        self.disk_hits += 1
+                        return value
+                    self._db.execute(
+                        "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                        (self.namespace, key)
+                    )
+                    self._db.commit()
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: str):
+        """Stores a value in memory and, if enabled, in the persistent tier."""
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, value, created_at)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO cache_entries (namespace, key, value, created_at) VALUES (?, ?, ?, ?)",
+                    (self.namespace, key, value, created_at)
+                )
+                self._db.commit()
+
+    def clear(self):
+        """Drops every entry of this namespace from both tiers."""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+                self._db.commit()
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters and the current in-memory size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "namespace": self.namespace,
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries_in_memory": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "persistent": self._db is not None,
+            }
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_cache(namespace: str) -> ResponseCache:
+    """
+    Returns the process-wide cache for a namespace, configured from config.py.
+
+    Args:
+        namespace: Logical name of the cache (e.g. "text").
+
+    Returns:
+        A shared ResponseCache instance.
+    """
+    cache = _caches.get(namespace)
+    if cache is not None:
+        return cache
+    with _caches_lock:
+        cache = _caches.get(namespace)
+        if cache is None:
+            cache = ResponseCache(
+                namespace,
+                max_entries=config.RESPONSE_CACHE_MAX_ENTRIES,
+                ttl_seconds=config.RESPONSE_CACHE_TTL_SECONDS,
+                db_path=config.RESPONSE_CACHE_DB_PATH or None,
+            )
+            _caches[namespace] = cache
+    return cache
+
+def get_text_cache() -> ResponseCache:
+    """Returns the cache used by generate_text_response."""
+    return get_cache("text")
+
+def all_cache_stats() -> dict:
+    """Returns the stats of every cache created so far, keyed by namespace."""
+    with _caches_lock:
+        caches = list(_caches.values())
+    return {cache.namespace: cache.stats() for cache in caches}
@@ -0,0 +1,79 @@
+KIND_TEXT = "text"
+KIND_VISION = "vision"
+KIND_IMAGE = "image"
+
+def prompt_with_instruction(system_instruction: str, prompt: str) -> str:
+    """The single prompt used by backends without system instructions: instructions, then the user query."""
+    if not system_instruction:
+        return prompt
+    return f"{system_instruction}\n\nUser Query:\n{prompt}"
+
+class TextStream:
+    """
+    Iterable of text chunks from a streamed generation.
+
+    completed becomes True once the chunks are exhausted and the backend reports that
+    the model finished normally (not blocked or cut off), i.e. the text may be cached.
+    """
+
+    def __init__(self, chunks, finished_normally=None):
+        self._chunks = chunks
+        self._finished_normally = finished_normally or (lambda: True)
+        self.completed = False
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            yield chunk
+        self.completed = self._finished_normally()
+
+class GeneratorBackend:
+    """
+    Interface between the generators and a model provider.
+
+    Methods perform exactly one upstream attempt; caching, coalescing, rate limiting
+    and retries are applied around them by the generators. Errors carrying an HTTP
+    status as .code or .response.status_code are classified by resilience.is_retryable.
+    """
+
+    name = None
+
+    def ensure_ready(self, kind: str):
+        """
+        Checks that calls of the given kind can be made (e.g. credentials are set).
+
+        Raises:
+            ValueError: If the backend is not configured for this kind of call.
+        """
+
+    def generate_text(self, model_name: str, prompt: str, generation_config: dict = None, timeout: float = None,
+                      system_instruction: str = None):
+        """
+        Returns the generated text, or None if the response was blocked or empty.
+
+        Args:
+            prompt: The variable user part of the request.
+            system_instruction: Optional static instructions (e.g. the content prompt).
+                Backends without native support prepend them to the prompt.
+        """
+        raise NotImplementedError
+
+    def stream_text(self, model_name: str, prompt: str, generation_config: dict = None, timeout: float = None,
+                    system_instruction: str = None) -> TextStream:
+        """Starts a streamed generation and returns its chunks (arguments as for generate_text)."""
+        raise NotImplementedError
+
+    def describe_images(self, model_name: str, contents: list, timeout: float = None):
+        """
+        Answers a multimodal request.
+
+        Args:
+            contents: Text parts and image parts (PIL images or {"mime_type", "data"} blobs), in order.
+
+        Returns:
+            The text answer, or None if the response was blocked or empty.
+        """
+        raise NotImplementedError
+
+    def generate_image(self, model_name: str, prompt: str, seed: int = None, timeout: float = None):
+        """Returns the generated PIL image."""
+        raise NotImplementedError
@@ -0,0 +1,98 @@
+import os
+import sys
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.core.generators.backends.base import GeneratorBackend, TextStream, KIND_TEXT, KIND_VISION
+from src.core.generators.client_registry import (
+    configure_gemini, get_gemini_model, get_gemini_model_for_prompt, get_inference_client
+)
+from src.core.generators.resilience import PROVIDER_GEMINI
+from src.core.utils.metrics import record_token_usage, record_upstream_error
+from src.core.utils.structured_logging import get_logger
+
+logger = get_logger("backend.live")
+
+def _request_options(timeout: float = None) -> dict:
+    return {"timeout": timeout} if timeout else {}
+
+def _record_usage(model_name: str, response):
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None:
+        record_token_usage(
+            model_name,
+            usage.prompt_token_count,
+            usage.candidates_token_count,
+            getattr(usage, "cached_content_token_count", None)
+        )
+
+def _finished_normally(model_name: str, response) -> bool:
+    if response.candidates and response.candidates[0].finish_reason.name != "STOP":
+        reason = response.candidates[0].finish_reason.name
+        logger.warning("Generation finished unexpectedly. Reason: %s", reason, extra={"model": model_name})
+        record_upstream_error(PROVIDER_GEMINI, model_name, f"finish_{reason.lower()}")
+        return False
+    return True
+
+def _blocked(model_name: str, response) -> bool:
+    if response.parts:
+        return False
+    logger.warning(
+        "Received an empty response. This might be due to safety filters.",
+        extra={"model": model_name, "prompt_feedback": str(response.prompt_feedback)}
+    )
+    record_upstream_error(PROVIDER_GEMINI, model_name, "safety_block")
+    return True
+
+def _response_text(model_name: str, response):
+    """Returns the response text, or None when the response was blocked or empty."""
+    _record_usage(model_name, response)
+    if _blocked(model_name, response):
+        return None
+    _finished_normally(model_name, response)
+    return response.text
+
+class LiveBackend(GeneratorBackend):
+    """Google Gemini for text and vision, Hugging Face Inference for images."""
+
+    name = "live"
+
+    def ensure_ready(self, kind: str):
+        if kind in (KIND_TEXT, KIND_VISION):
+            # Raises ValueError if the API key is missing
+            configure_gemini()
+
+    def generate_text(self, model_name: str, prompt: str, generation_config: dict = None, timeout: float = None,
+                      system_instruction: str = None):
+        # The static prompt is a system instruction, served from Gemini's context cache when large enough
+        model = get_gemini_model_for_prompt(model_name, system_instruction, generation_config)
+        response = model.generate_content(prompt, request_options=_request_options(timeout))
+        return _response_text(model_name, response)
+
+    def stream_text(self, model_name: str, prompt: str, generation_config: dict = None, timeout: float = None,
+                    system_instruction: str = None) -> TextStream:
+        model = get_gemini_model_for_prompt(model_name, system_instruction, generation_config)
+        response = model.generate_content(prompt, stream=True, request_options=_request_options(timeout))
+
+        def chunks():
+            for chunk in response:
+                if chunk.parts and chunk.text:
+                    yield chunk.text
+
+        def finished_normally():
+            # Usage metadata is only complete once the stream has been consumed
+            _record_usage(model_name, response)
+            return _finished_normally(model_name, response) and not _blocked(model_name, response)
+
+        return TextStream(chunks(), finished_normally)
+
+    def describe_images(self, model_name: str, contents: list, timeout: float = None):
+        model = get_gemini_model(model_name)
+        response = model.generate_content(contents, request_options=_request_options(timeout))
+        return _response_text(model_name, response)
+
+    def generate_image(self, model_name: str, prompt: str, seed: int = None, timeout: float = None):
+        client = get_inference_client(timeout=timeout)
+        return client.text_to_image(prompt, model=model_name, seed=seed)
@@ -0,0 +1,216 @@
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+
+from PIL import Image
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+import config
+from src.core.generators.backends.base import (
+    GeneratorBackend, TextStream, KIND_TEXT, KIND_VISION, KIND_IMAGE, prompt_with_instruction
+)
+
+LATENCY_FIXED = "fixed"
+LATENCY_UNIFORM = "uniform"
+LATENCY_NORMAL = "normal"
+LATENCY_LOGNORMAL = "lognormal"
+LATENCY_DISTRIBUTIONS = (LATENCY_FIXED, LATENCY_UNIFORM, LATENCY_NORMAL, LATENCY_LOGNORMAL)
+
+# Section markers such as "=== DRAFT ===" that a prompt asks the answer to contain
+_SECTION_MARKER_PATTERN = re.compile(r"^=== ([A-Z][A-Z ]*) ===$", re.MULTILINE)
+_PAGE_LABEL_PATTERN = re.compile(r"^Page (\d+):$")
+
+_WORDS = (
+    "growth", "team", "insight", "strategy", "customer", "data", "product", "launch", "lesson",
+    "impact", "network", "career", "platform", "market", "quality", "design", "feedback", "scale",
+    "learning", "results", "process", "community", "innovation", "metric", "roadmap", "trust",
+)
+
+class StubUpstreamError(RuntimeError):
+    """Injected failure; carries an HTTP status like the real SDK errors."""
+
+    def __init__(self, code: int, kind: str):
+        self.code = code
+        super().__init__(f"Stub backend injected a {code} error for a {kind} call.")
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class StubBackend(GeneratorBackend):
+    """
+    Offline backend for load tests and profiling. Returns deterministic outputs (the same
+    request always gets the same answer, or a recorded one), sleeps for a latency drawn
+    from a configurable distribution, and fails a configurable fraction of calls.
+    """
+
+    name = "stub"
+
+    def __init__(self, latency_ms: dict, jitter_ms: float, distribution: str, error_rate: float,
+                 error_codes: list, recordings_path: str = None, random_seed: int = None,
+                 text_words: int = 150, stream_chunks: int = 8, image_size: int = 1024):
+        """
+        Args:
+            latency_ms: Mean latency per call kind ("text", "vision", "image") in milliseconds.
+            jitter_ms: Spread of the latency (standard deviation, or half-width for "uniform").
+            distribution: One of LATENCY_DISTRIBUTIONS.
+            error_rate: Fraction of calls (0-1) that raise StubUpstreamError.
+            error_codes: HTTP statuses picked at random for injected errors.
+            recordings_path: Optional JSON file {SHA-256 of the prompt text: answer} with
+                recorded outputs to return instead of generated filler.
+            random_seed: Seeds latency and error sampling for reproducible runs.
+            text_words: Length of generated filler answers.
+            stream_chunks: Number of chunks a streamed answer is split into.
+            image_size: Side of the generated square images in pixels.
+        """
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution '{distribution}'. Choose one of: {', '.join(LATENCY_DISTRIBUTIONS)}.")
+        self.latency_ms = dict(latency_ms)
+        self.jitter_ms = max(0.0, jitter_ms)
+        self.distribution = distribution
+        self.error_rate = min(1.0, max(0.0, error_rate))
+        self.error_codes = list(error_codes) or [503]
+        self.text_words = max(1, text_words)
+        self.stream_chunks = max(1, stream_chunks)
+        self.image_size = max(8, image_size)
+        self.recordings = {}
+        if recordings_path:
+            with open(recordings_path, "r", encoding="utf-8") as f:
+                self.recordings = json.load(f)
+        self._random = random.Random(random_seed)
+        self._lock = threading.Lock()
+
+    def _sample_latency(self, kind: str) -> float:
+        """Latency in seconds for one call of the given kind."""
+        mean = self.latency_ms.get(kind, 0.0)
+        with self._lock:
+            if self.distribution == LATENCY_UNIFORM:
+                value = self._random.uniform(mean - self.jitter_ms, mean + self.jitter_ms)
+            elif self.distribution == LATENCY_NORMAL:
+                value = self._random.gauss(mean, self.jitter_ms)
+            elif self.distribution == LATENCY_LOGNORMAL and mean > 0:
+                # Parameterised so the distribution has the configured mean and standard deviation
+                sigma = math.sqrt(math.log(1 + (self.jitter_ms / mean) ** 2))
+                value = self._random.lognormvariate(math.log(mean) - sigma ** 2 / 2, sigma)
+            else:
+                value = mean
+        return max(0.0, value) / 1000.0
+
+    def _maybe_fail(self, kind: str):
+        with self._lock:
+            failed = self._random.random() < self.error_rate
+            code = self._random.choice(self.error_codes)
+        if failed:
+            raise StubUpstreamError(code, kind)
+
+    def _simulate_call(self, kind: str, timeout: float = None):
+        latency = self._sample_latency(kind)
+        if timeout is not None and latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Stub backend {kind} call exceeded its {timeout:.1f}s timeout.")
+        time.sleep(latency)
+        self._maybe_fail(kind)
+
+    def _filler(self, seed_text: str, words: int = None) -> str:
+        rng = random.Random(_digest(seed_text))
+        return " ".join(rng.choice(_WORDS) for _ in range(words or self.text_words)).capitalize() + "."
+
+    def _answer(self, prompt: str) -> str:
+        """A recorded answer, or deterministic filler honouring the section markers the prompt asks for."""
+        key = _digest(prompt)
+        if key in self.recordings:
+            return self.recordings[key]
+        markers = _SECTION_MARKER_PATTERN.findall(prompt)
+        if not markers:
+            return f"[stub {key[:8]}] {self._filler(prompt)}"
+        return "\n".join(f"=== {marker} ===\n{self._filler(prompt + marker)}" for marker in markers)
+
+    def ensure_ready(self, kind: str):
+        pass
+
+    def generate_text(self, model_name: str, prompt: str, generation_config: dict = None, timeout: float = None,
+                      system_instruction: str = None):
+        self._simulate_call(KIND_TEXT, timeout)
+        return self._answer(prompt_with_instruction(system_instruction, prompt))
+
+    def stream_text(self, model_name: str, prompt: str, generation_config: dict = None, timeout: float = None,
+                    system_instruction: str = None) -> TextStream:
+        # Time to first chunk is a share of the latency; the rest is spread over the chunks
+        total = self._sample_latency(KIND_TEXT)
+        if timeout is not None and total > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Stub backend stream exceeded its {timeout:.1f}s timeout.")
+        per_chunk = total / (self.stream_chunks + 1)
+        time.sleep(per_chunk)
+        self._maybe_fail(KIND_TEXT)
+
+        words = self._answer(prompt_with_instruction(system_instruction, prompt)).split(" ")
+        size = max(1, math.ceil(len(words) / self.stream_chunks))
+
+        def chunks():
+            for start in range(0, len(words), size):
+                if start:
+                    time.sleep(per_chunk)
+                yield (" " if start else "") + " ".join(words[start:start + size])
+
+        return TextStream(chunks())
+
+    def describe_images(self, model_name: str, contents: list, timeout: float = None):
+        self._simulate_call(KIND_VISION, timeout)
+        text_parts = [part for part in contents if isinstance(part, str)]
+        image_digests = []
+        for part in contents:
+            if isinstance(part, dict):
+                image_digests.append(hashlib.sha256(part["data"]).hexdigest())
+            elif isinstance(part, Image.Image):
+                image_digests.append(hashlib.sha256(part.tobytes()).hexdigest())
+        prompt = "\n".join(text_parts)
+        key = _digest(prompt)
+        if key in self.recordings:
+            return self.recordings[key]
+
+        # Multi-page requests label each image "Page N:"; answer with one section per page
+        pages = [int(match.group(1)) for match in (_PAGE_LABEL_PATTERN.match(part) for part in text_parts[1:]) if match]
+        if pages:
+            return "\n".join(
+                f"=== Page {page} ===\n{self._filler(prompt + digest)}" for page, digest in zip(pages, image_digests)
+            )
+        return f"[stub {key[:8]}] {self._filler(prompt + ''.join(image_digests))}"
+
+    def generate_image(self, model_name: str, prompt: str, seed: int = None, timeout: float = None):
+        self._simulate_call(KIND_IMAGE, timeout)
+        # A gradient whose colours depend on the prompt and seed
+        rng = random.Random(_digest(f"{prompt}|{seed}"))
+        start = tuple(rng.randrange(256) for _ in range(3))
+        end = tuple(rng.randrange(256) for _ in range(3))
+        gradient = Image.linear_gradient("L").resize((self.image_size, self.image_size))
+        return Image.merge("RGB", [
+            gradient.point(lambda v, a=a, b=b: a + (b - a) * v // 255) for a, b in zip(start, end)
+        ])
+
+def stub_backend_from_config() -> StubBackend:
+    """Builds the stub backend from the STUB_* settings in config.py."""
+    return StubBackend(
+        latency_ms={
+            KIND_TEXT: config.STUB_TEXT_LATENCY_MS,
+            KIND_VISION: config.STUB_VISION_LATENCY_MS,
+            KIND_IMAGE: config.STUB_IMAGE_LATENCY_MS,
+        },
+        jitter_ms=config.STUB_LATENCY_JITTER_MS,
+        distribution=config.STUB_LATENCY_DISTRIBUTION,
+        error_rate=config.STUB_ERROR_RATE,
+        error_codes=config.STUB_ERROR_CODES,
+        recordings_path=config.STUB_RECORDINGS_PATH or None,
+        random_seed=config.STUB_RANDOM_SEED,
+        text_words=config.STUB_TEXT_WORDS,
+        stream_chunks=config.STUB_STREAM_CHUNKS,
+        image_size=config.STUB_IMAGE_SIZE,
+    )
@@ -0,0 +1,227 @@
+import google.generativeai as genai
+from huggingface_hub import InferenceClient
+import copy
+import datetime
+import hashlib
+import json
+import math
+import os
+import sys
+import threading
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+import config
+from src.core.utils.structured_logging import get_logger
+
+logger = get_logger("clients")
+
+_lock = threading.Lock()
+_gemini_configured = False
+_gemini_models = {}
+_inference_clients = {}
+_backend = None
+# (model name, system instruction digest) -> (CachedContent or None if caching failed, expires at)
+_context_caches = {}
+_context_cache_lock = threading.Lock()
+# Refresh a cached context this long before it expires, so calls never reference an expired one
+_CONTEXT_CACHE_REFRESH_MARGIN_SECONDS = 60
+
+def configure_gemini():
+    """
+    Configures the google.generativeai SDK exactly once per process.
+
+    Raises:
+        ValueError: If GOOGLE_API_KEY is not set.
+    """
+    global _gemini_configured
+    if _gemini_configured:
+        return
+    if not config.GOOGLE_API_KEY:
+        raise ValueError("API key not found. Please check your .env file and config.py.")
+    with _lock:
+        if not _gemini_configured:
+            genai.configure(api_key=config.GOOGLE_API_KEY)
+            _gemini_configured = True
+
+def _settings_key(settings) -> str:
+    """Builds a stable, hashable key for optional model settings."""
+    if settings is None:
+        return ""
+    return json.dumps(settings, sort_keys=True, default=str)
+
+def get_gemini_model(model_name: str, system_instruction: str = None, generation_config: dict = None) -> genai.GenerativeModel:
+    """
+    Returns a shared GenerativeModel for the given model name and settings.
+
+    Models are built once and reused across requests, threads and coroutines,
+    so the underlying client and its connections are not recreated per call.
+
+    Args:
+        model_name: The Gemini model to use.
+        system_instruction: Optional system instruction bound to the model.
+        generation_config: Optional generation settings (temperature, max_output_tokens, ...).
+
+    Returns:
+        A cached genai.GenerativeModel instance.
+    """
+    configure_gemini()
+    key = (model_name, system_instruction or "", _settings_key(generation_config))
+    model = _gemini_models.get(key)
+    if model is not None:
+        return model
+    with _lock:
+        model = _gemini_models.get(key)
+        if model is None:
+            model = genai.GenerativeModel(
+                model_name,
+                system_instruction=system_instruction,
+                generation_config=generation_config
+            )
+            _gemini_models[key] = model
+    return model
+
+def _context_cache_for(model_name: str, system_instruction: str):
+    """
+    Returns the Gemini cached context holding system_instruction for model_name,
+    creating (or re-creating, near expiry) it as needed. Returns None when the prompt
+    is below config.GEMINI_CONTEXT_CACHE_MIN_TOKENS or the API refused to cache it;
+    a refusal is remembered for one TTL so it is not retried on every call.
+    """
+    if not config.GEMINI_CONTEXT_CACHE_ENABLED:
+        return None
+    if math.ceil(len(system_instruction) / config.CHARS_PER_TOKEN) < config.GEMINI_CONTEXT_CACHE_MIN_TOKENS:
+        return None
+
+    key = (model_name, hashlib.sha256(system_instruction.encode("utf-8")).hexdigest())
+    entry = _context_caches.get(key)
+    if entry is not None and time.time() < entry[1] - _CONTEXT_CACHE_REFRESH_MARGIN_SECONDS:
+        return entry[0]
+    with _context_cache_lock:
+        entry = _context_caches.get(key)
+        if entry is not None and time.time() < entry[1] - _CONTEXT_CACHE_REFRESH_MARGIN_SECONDS:
+            return entry[0]
+        ttl = config.GEMINI_CONTEXT_CACHE_TTL_SECONDS
+        try:
+            # Older SDK versions have no caching module; they fall back like a refusal
+            from google.generativeai import caching
+            cached_content = caching.CachedContent.create(
+                model=model_name,
+                display_name=f"linkgenix-{key[1][:12]}",
+                system_instruction=system_instruction,
+                ttl=datetime.timedelta(seconds=ttl)
+            )
+            logger.info("Created Gemini context cache %s for %s.", cached_content.name, model_name)
+        except Exception as e:
+            logger.warning("Context caching is not available for %s, sending the system instruction instead: %s", model_name, e)
+            cached_content = None
+        _context_caches[key] = (cached_content, time.time() + ttl)
+        if entry is not None and entry[0] is not None:
+            _drop_cached_models(entry[0].name)
+    return cached_content
+
+def _drop_cached_models(cached_content_name: str):
+    """Removes the models built from a cached context that has been replaced."""
+    prefix = f"cached:{cached_content_name}"
+    with _lock:
+        for key in [key for key in _gemini_models if key[0] == prefix]:
+            del _gemini_models[key]
+
+def get_gemini_model_for_prompt(model_name: str, system_instruction: str = None,
+                                generation_config: dict = None) -> genai.GenerativeModel:
+    """
+    Returns a shared GenerativeModel for a static system prompt.
+
+    If the prompt qualifies for Gemini context caching, the model references the
+    cached context, so each call only sends (and is billed in full for) the
+    variable user part. Otherwise the prompt is bound as system_instruction of a
+    locally cached model (see get_gemini_model).
+    """
+    configure_gemini()
+    cached_content = _context_cache_for(model_name, system_instruction) if system_instruction else None
+    if cached_content is None:
+        return get_gemini_model(model_name, system_instruction=system_instruction, generation_config=generation_config)
+
+    key = (f"cached:{cached_content.name}", "", _settings_key(generation_config))
+    model = _gemini_models.get(key)
+    if model is not None:
+        return model
+    with _lock:
+        model = _gemini_models.get(key)
+        if model is None:
+            model = genai.GenerativeModel.from_cached_content(
+                cached_content=cached_content,
+                generation_config=generation_config
+            )
+            _gemini_models[key] = model
+    return model
+
+def get_inference_client(provider: str = None, timeout: float = None) -> InferenceClient:
+    """
+    Returns a shared Hugging Face InferenceClient for the given provider.
+
+    Args:
+        provider: The inference provider (defaults to config.HF_INFERENCE_PROVIDER).
+        timeout: Optional request timeout for this call. The client only takes a timeout
+            at construction, so a shallow copy of the shared client (same session and
+            settings) is returned with it.
+
+    Returns:
+        A cached InferenceClient instance, or a copy of it with the given timeout.
+    """
+    provider = provider or config.HF_INFERENCE_PROVIDER
+    client = _inference_clients.get(provider)
+    if client is None:
+        with _lock:
+            client = _inference_clients.get(provider)
+            if client is None:
+                client = InferenceClient(
+                    provider=provider,
+                    api_key=config.HF_TOKEN,
+                    timeout=config.UPSTREAM_DEADLINE_SECONDS["hf"]
+                )
+                _inference_clients[provider] = client
+    if timeout:
+        client = copy.copy(client)
+        client.timeout = timeout
+    return client
+
+def get_backend():
+    """
+    Returns the process-wide generator backend selected by config.GENERATOR_BACKEND:
+    "live" (Gemini and Hugging Face) or "stub" (offline, for load tests).
+
+    Raises:
+        ValueError: If the configured backend is unknown.
+    """
+    global _backend
+    if _backend is not None:
+        return _backend
+    with _lock:
+        if _backend is None:
+            # Imported here because the live backend builds its clients through this module
+            if config.GENERATOR_BACKEND == "live":
+                from src.core.generators.backends.live import LiveBackend
+                _backend = LiveBackend()
+            elif config.GENERATOR_BACKEND == "stub":
+                from src.core.generators.backends.stub import stub_backend_from_config
+                _backend = stub_backend_from_config()
+            else:
+                raise ValueError(f"Unknown GENERATOR_BACKEND '{config.GENERATOR_BACKEND}'. Choose 'live' or 'stub'.")
+    return _backend
+
+def init_clients():
+    """
+    Warms up the registry at application startup: selects the backend and, for the live
+    backend, configures Gemini and builds the default models and inference client so
+    the first request pays no setup cost.
+    """
+    if get_backend().name != "live":
+        return
+    if config.GOOGLE_API_KEY:
+        for model_name in {config.DEFAULT_GEMINI_FLASH_MODEL, config.DEFAULT_GEMINI_PRO_MODEL}:
+            get_gemini_model(model_name)
+    get_inference_client()
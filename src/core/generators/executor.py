@@ -0,0 +1,109 @@
+import asyncio
+import contextvars
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+import config
+from src.core.utils.stage_timing import record_stage
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_generator_executor() -> ThreadPoolExecutor:
+    """
+    Returns the dedicated thread pool used for blocking model calls.
+
+    The pool is created lazily and sized by config.GENERATOR_MAX_WORKERS, so slow
+    upstream calls never occupy the event loop or the default FastAPI threadpool.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=max(1, config.GENERATOR_MAX_WORKERS),
+                    thread_name_prefix="linkgenix-generator",
+                )
+    return _executor
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Runs a blocking generator function on the dedicated executor and awaits its result.
+    The caller's context variables (e.g. request timings) are visible to the function,
+    and the time spent queued for a worker is recorded as the "executor_wait" stage.
+
+    Args:
+        func: The synchronous callable to run.
+        *args, **kwargs: Arguments forwarded to the callable.
+
+    Returns:
+        Whatever the callable returns.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    submitted = time.perf_counter()
+
+    def run():
+        record_stage("executor_wait", time.perf_counter() - submitted)
+        return func(*args, **kwargs)
+
+    return await loop.run_in_executor(get_generator_executor(), context.run, run)
+
+async def iterate_blocking(func, *args, **kwargs):
+    """
+    Consumes a blocking iterator (e.g. a streaming model response) on the dedicated
+    executor and re-yields its items on the event loop as they arrive.
+
+    If the consumer stops early, the worker thread stops pulling from the iterator
+    at the next item.
+
+    Args:
+        func: A callable returning an iterator (typically a generator function).
+        *args, **kwargs: Arguments forwarded to the callable.
+
+    Yields:
+        The items produced by the iterator, in order.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    stop = threading.Event()
+    done = object()
+
+    def produce():
+        try:
+            for item in func(*args, **kwargs):
+                if stop.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, (item, None))
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, (done, e))
+        else:
+            loop.call_soon_threadsafe(queue.put_nowait, (done, None))
+
+    worker = loop.run_in_executor(get_generator_executor(), contextvars.copy_context().run, produce)
+    try:
+        while True:
+            item, error = await queue.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                break
+            yield item
+    finally:
+        stop.set()
+    await worker
+
+def shutdown_generator_executor(wait: bool = True):
+    """Shuts down the dedicated executor (called when the API stops)."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
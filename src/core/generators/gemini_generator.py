@@ -1,52 +1,162 @@
-import google.generativeai as genai
 import PIL.Image
+import hashlib
 import os
 import sys
+from typing import List, Union
 
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
 if project_root not in sys.path:
     sys.path.append(project_root)
 
 import config
+from src.core.generators.executor import run_blocking
+from src.core.generators.client_registry import get_backend
+from src.core.generators.backends.base import KIND_VISION
+from src.core.generators.resilience import call_upstream, UpstreamUnavailableError, PROVIDER_GEMINI
+from src.core.generators.single_flight import get_single_flight
+from src.core.cache.response_cache import make_cache_key
+from src.core.utils.stage_timing import stage_timer
+from src.core.utils.structured_logging import get_logger, log_prompt
 
-def ask_gemini_about_image(image_path: str, text_prompt: str, model_name: str = config.DEFAULT_GEMINI_FLASH_MODEL):
+logger = get_logger("vision")
+
+def _load_image_part(image: Union[str, dict, PIL.Image.Image]):
+    """
+    Turns the supported image inputs into a content part for generate_content.
+
+    Paths are opened with PIL; PIL images and in-memory blobs
+    ({"mime_type": ..., "data": bytes}) are passed through untouched.
+    """
+    if isinstance(image, str):
+        return PIL.Image.open(image)
+    return image
+
+def _image_digest(image: Union[str, dict, PIL.Image.Image]) -> str:
+    """Identifies an image input for request coalescing (paths by name, everything else by content)."""
+    if isinstance(image, str):
+        return f"file:{os.path.abspath(image)}"
+    if isinstance(image, dict):
+        return hashlib.sha256(image["data"]).hexdigest()
+    return hashlib.sha256(image.tobytes()).hexdigest() + f":{image.mode}:{image.size}"
+
+def ask_gemini_about_image(image: Union[str, dict, PIL.Image.Image], text_prompt: str, model_name: str = config.DEFAULT_GEMINI_FLASH_MODEL):
     """
     Sends an image and a text prompt to the specified Gemini model.
 
     Args:
-        image_path: Path to the image file.
+        image: Path to an image file, a PIL image, or an already encoded in-memory
+            blob such as {"mime_type": "image/png", "data": png_bytes}.
         text_prompt: The question or instruction related to the image.
         model_name: The Gemini model to use (defaults to config.DEFAULT_GEMINI_FLASH_MODEL).
 
     Returns:
         The text response from the model, or None if an error occurs.
-    """
-    if not config.GOOGLE_API_KEY:
-        raise ValueError("API key not found. Please check your .env file and config.py.")
 
-    genai.configure(api_key=config.GOOGLE_API_KEY)
+    Raises:
+        UpstreamUnavailableError: If Gemini is rate limited or degraded beyond the retry budget.
+    """
+    backend = get_backend()
+    # Raises ValueError if the API key is missing
+    backend.ensure_ready(KIND_VISION)
 
-    print(f"Loading image from: {image_path}")
-    print(f"Using model: {model_name}")
-    print(f"Sending prompt: {text_prompt}")
+    logger.debug("Describing image", extra={"model": model_name, "image": image if isinstance(image, str) else None})
+    log_prompt(logger, "Vision prompt", text_prompt, model=model_name)
 
     try:
-        img = PIL.Image.open(image_path)
-        model = genai.GenerativeModel(model_name)
-        response = model.generate_content([text_prompt, img])
-
-        if not response.parts:
-            print("Warning: Received an empty response. This might be due to safety filters.")
-            print(f"Prompt Feedback: {response.prompt_feedback}")
-            return None
-        if response.candidates and response.candidates[0].finish_reason.name != "STOP":
-            print(f"Warning: Generation finished unexpectedly. Reason: {response.candidates[0].finish_reason.name}")
-
-        return response.text
+        img = _load_image_part(image)
+        # Identical requests already in flight share that call instead of starting their own
+        with stage_timer("vision_model"):
+            return get_single_flight("vision").do(
+                make_cache_key(text_prompt, model_name, _image_digest(image)),
+                lambda: call_upstream(
+                    PROVIDER_GEMINI,
+                    model_name,
+                    lambda timeout: backend.describe_images(model_name, [text_prompt, img], timeout)
+                )
+            )
 
     except FileNotFoundError:
-        print(f"Error: Image file not found at '{image_path}'")
+        logger.error("Image file not found at '%s'", image)
         return None
+    except UpstreamUnavailableError:
+        raise
     except Exception as e:
-        print(f"An error occurred: {e}")
-        return None
\ No newline at end of file
+        logger.error("Vision request failed: %s", e, extra={"model": model_name})
+        return None
+
+def ask_gemini_about_images(images: List[Union[str, dict, PIL.Image.Image]], text_prompt: str, labels: List[str] = None,
+                            model_name: str = config.DEFAULT_GEMINI_FLASH_MODEL):
+    """
+    Sends several images in one multimodal request, each preceded by its label.
+
+    Args:
+        images: The images, in any form accepted by ask_gemini_about_image.
+        text_prompt: The instruction covering all images.
+        labels: Optional text placed before each image (e.g. "Page 3:") so the
+            model can refer to them; must match the number of images.
+        model_name: The Gemini model to use (defaults to config.DEFAULT_GEMINI_FLASH_MODEL).
+
+    Returns:
+        The text response from the model, or None if an error occurs.
+
+    Raises:
+        UpstreamUnavailableError: If Gemini is rate limited or degraded beyond the retry budget.
+    """
+    if labels is not None and len(labels) != len(images):
+        raise ValueError("labels must have one entry per image.")
+
+    backend = get_backend()
+    # Raises ValueError if the API key is missing
+    backend.ensure_ready(KIND_VISION)
+
+    logger.debug("Describing images", extra={"model": model_name, "images": len(images)})
+    log_prompt(logger, "Vision prompt", text_prompt, model=model_name)
+
+    try:
+        contents = [text_prompt]
+        for i, image in enumerate(images):
+            if labels is not None:
+                contents.append(labels[i])
+            contents.append(_load_image_part(image))
+        with stage_timer("vision_model"):
+            return get_single_flight("vision").do(
+                make_cache_key(text_prompt, model_name, labels, [_image_digest(image) for image in images]),
+                lambda: call_upstream(
+                    PROVIDER_GEMINI,
+                    model_name,
+                    lambda timeout: backend.describe_images(model_name, contents, timeout)
+                )
+            )
+
+    except UpstreamUnavailableError:
+        raise
+    except Exception as e:
+        logger.error("Vision request failed: %s", e, extra={"model": model_name, "images": len(images)})
+        return None
+
+async def ask_gemini_about_images_async(images: List[Union[str, dict, PIL.Image.Image]], text_prompt: str, labels: List[str] = None,
+                                        model_name: str = config.DEFAULT_GEMINI_FLASH_MODEL):
+    """
+    Async variant of ask_gemini_about_images, run on the dedicated generator executor.
+    """
+    return await run_blocking(
+        ask_gemini_about_images,
+        images=images,
+        text_prompt=text_prompt,
+        labels=labels,
+        model_name=model_name
+    )
+
+async def ask_gemini_about_image_async(image: Union[str, dict, PIL.Image.Image], text_prompt: str, model_name: str = config.DEFAULT_GEMINI_FLASH_MODEL):
+    """
+    Async variant of ask_gemini_about_image.
+
+    Runs the blocking Gemini call on the dedicated generator executor so the
+    event loop stays free to serve other requests while the model responds.
+    """
+    return await run_blocking(
+        ask_gemini_about_image,
+        image=image,
+        text_prompt=text_prompt,
+        model_name=model_name
+    )
@@ -1,31 +1,41 @@
-from huggingface_hub import InferenceClient
 from PIL import Image # Import Image type hint
 import sys
 import os
 
 # Add the project root to the Python path to allow importing config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-from config import HF_TOKEN # Import the token from config
+import config
+from src.core.generators.client_registry import get_backend
+from src.core.generators.resilience import call_upstream, PROVIDER_HF
+from src.core.generators.single_flight import get_single_flight
+from src.core.cache.response_cache import make_cache_key
+from src.core.utils.stage_timing import stage_timer
 
-client = InferenceClient(
-    provider="hf-inference",
-    api_key=HF_TOKEN, # Use the token from config
-)
-
-def generate_image_from_prompt(prompt: str) -> Image.Image:
+def generate_image_from_prompt(prompt: str, seed: int = None) -> Image.Image:
     """
-    Generates an image based on the provided text prompt using the InferenceClient.
+    Generates an image based on the provided text prompt using the configured backend
+    (the shared InferenceClient for the live backend).
 
     Args:
         prompt: The text prompt to generate the image from.
+        seed: Optional seed; the same prompt and seed reproduce the same image.
 
     Returns:
         A PIL.Image object representing the generated image.
+
+    Raises:
+        UpstreamUnavailableError: If the provider is rate limited or degraded beyond the retry budget.
     """
-    # output is a PIL.Image object
-    image = client.text_to_image(
-        prompt,
-        model="black-forest-labs/FLUX.1-dev",
-    )
+    backend = get_backend()
+    # output is a PIL.Image object.
+    # Identical requests already in flight share that call instead of starting their own.
+    with stage_timer("image_model"):
+        image = get_single_flight("image").do(
+            make_cache_key(prompt, config.DEFAULT_IMAGE_MODEL, seed),
+            lambda: call_upstream(
+                PROVIDER_HF,
+                config.DEFAULT_IMAGE_MODEL,
+                lambda timeout: backend.generate_image(config.DEFAULT_IMAGE_MODEL, prompt, seed=seed, timeout=timeout)
+            )
+        )
     return image
-
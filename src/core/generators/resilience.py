@@ -0,0 +1,295 @@
+import os
+import random
+import sys
+import threading
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+import config
+from src.core.utils.metrics import UPSTREAM_CALLS_IN_FLIGHT, record_upstream_error
+from src.core.utils.stage_timing import record_stage, stage_timer
+from src.core.utils.structured_logging import get_logger
+
+try:
+    import requests
+except ImportError:  # Only used to recognise transport errors
+    requests = None
+
+logger = get_logger("resilience")
+
+PROVIDER_GEMINI = "gemini"
+PROVIDER_HF = "hf"
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+# HTTP statuses worth retrying: timeouts, rate limits and server-side failures
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+class UpstreamUnavailableError(RuntimeError):
+    """
+    Raised when a model call is not attempted or is given up on: the circuit is open,
+    the deadline passed while waiting for the rate limiter, or retryable errors
+    persisted through every attempt.
+    """
+
+    def __init__(self, upstream: str, message: str, retry_after: float = None):
+        self.upstream = upstream
+        self.retry_after = retry_after
+        super().__init__(message)
+
+def _status_code(error: Exception):
+    # google.api_core errors expose the HTTP status as .code; requests/HF errors via .response
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        return code
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None)
+
+def is_retryable(error: Exception) -> bool:
+    """True for transient upstream errors (rate limits, timeouts, 5xx, dropped connections)."""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    if requests is not None and isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    return _status_code(error) in RETRYABLE_STATUS_CODES
+
+def error_reason(error: Exception) -> str:
+    """Classifies a failed attempt for the upstream error counter."""
+    status = _status_code(error)
+    if isinstance(error, TimeoutError) or status in (408, 504) or (
+            requests is not None and isinstance(error, requests.exceptions.Timeout)):
+        return "timeout"
+    if status == 429:
+        return "rate_limited"
+    if isinstance(error, ConnectionError) or (
+            requests is not None and isinstance(error, requests.exceptions.ConnectionError)):
+        return "connection"
+    if isinstance(status, int) and status >= 500:
+        return "server_error"
+    if isinstance(status, int) and status >= 400:
+        return "client_error"
+    return "other"
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff: a random delay up to base * 2^(attempt - 1), capped."""
+    ceiling = min(config.UPSTREAM_BACKOFF_MAX_SECONDS, config.UPSTREAM_BACKOFF_BASE_SECONDS * (2 ** (attempt - 1)))
+    return random.uniform(0, ceiling)
+
+class TokenBucket:
+    """Thread-safe token bucket: refills at rate_per_minute, holds at most burst tokens."""
+
+    def __init__(self, rate_per_minute: float, burst: int):
+        self.rate = max(0.0, rate_per_minute) / 60.0
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float = None) -> bool:
+        """
+        Takes one token, sleeping until one is available.
+
+        Returns:
+            False if no token could be had within timeout seconds.
+        """
+        if self.rate <= 0:
+            return True  # Unlimited
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive retryable failures and rejects calls for
+    reset_seconds. It then lets a single trial call through (half-open): success closes
+    the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.state = CIRCUIT_CLOSED
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == CIRCUIT_CLOSED:
+                return True
+            if self.state == CIRCUIT_OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self.state = CIRCUIT_HALF_OPEN
+            if self.state == CIRCUIT_HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def retry_after(self) -> float:
+        with self._lock:
+            return max(0.0, self.reset_seconds - (time.monotonic() - self._opened_at))
+
+    def release_trial(self):
+        """Frees the half-open trial slot without changing the state."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CIRCUIT_CLOSED
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._trial_in_flight = False
+            if self.state == CIRCUIT_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self.state = CIRCUIT_OPEN
+                self._opened_at = time.monotonic()
+
+class Upstream:
+    """Rate limiter, circuit breaker and counters for one provider/model pair."""
+
+    def __init__(self, name: str, rate_per_minute: float, burst: int, failure_threshold: int, reset_seconds: float):
+        self.name = name
+        self.bucket = TokenBucket(rate_per_minute, burst)
+        self.breaker = CircuitBreaker(failure_threshold, reset_seconds)
+        self.rate_per_minute = rate_per_minute
+        self.counters = {"calls": 0, "retries": 0, "rejected": 0, "failures": 0}
+        self._lock = threading.Lock()
+
+    def count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            "rate_per_minute": self.rate_per_minute,
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            **counters,
+        }
+
+_upstreams = {}
+_upstreams_lock = threading.Lock()
+
+def get_upstream(provider: str, model_name: str) -> Upstream:
+    """Returns the shared Upstream for a provider/model pair, configured from config.py."""
+    name = f"{provider}:{model_name}"
+    upstream = _upstreams.get(name)
+    if upstream is not None:
+        return upstream
+    with _upstreams_lock:
+        upstream = _upstreams.get(name)
+        if upstream is None:
+            rate = config.UPSTREAM_RATE_LIMIT_OVERRIDES.get(name, config.UPSTREAM_REQUESTS_PER_MINUTE[provider])
+            upstream = Upstream(
+                name,
+                rate_per_minute=float(rate),
+                burst=config.UPSTREAM_BURST,
+                failure_threshold=config.CIRCUIT_FAILURE_THRESHOLD,
+                reset_seconds=config.CIRCUIT_RESET_SECONDS,
+            )
+            _upstreams[name] = upstream
+    return upstream
+
+def call_upstream(provider: str, model_name: str, attempt_call, deadline_seconds: float = None):
+    """
+    Runs one logical model call under the provider/model rate limit, retrying
+    retryable errors with jittered exponential backoff until the deadline.
+    Blocking; call it from the generator executor.
+
+    Args:
+        provider: PROVIDER_GEMINI or PROVIDER_HF.
+        model_name: The model being called.
+        attempt_call: Performs one attempt. Receives the seconds left before the
+            deadline, to use as its request timeout.
+        deadline_seconds: Budget for the whole call including waits and retries
+            (defaults to config.UPSTREAM_DEADLINE_SECONDS for the provider).
+
+    Returns:
+        Whatever attempt_call returns.
+
+    Raises:
+        UpstreamUnavailableError: If the circuit is open, the deadline passes, or
+            every attempt fails with a retryable error.
+        Exception: Non-retryable errors from attempt_call are raised unchanged.
+    """
+    upstream = get_upstream(provider, model_name)
+    deadline = time.monotonic() + (deadline_seconds or config.UPSTREAM_DEADLINE_SECONDS[provider])
+
+    attempt = 0
+    while True:
+        attempt += 1
+        if not upstream.breaker.allow():
+            upstream.count("rejected")
+            record_upstream_error(provider, model_name, "circuit_open")
+            raise UpstreamUnavailableError(
+                upstream.name,
+                f"{upstream.name} is temporarily unavailable (circuit open).",
+                retry_after=upstream.breaker.retry_after()
+            )
+
+        remaining = deadline - time.monotonic()
+        with stage_timer("rate_limit_wait"):
+            acquired = remaining > 0 and upstream.bucket.acquire(timeout=remaining)
+        if not acquired:
+            # Give the half-open trial slot back; nothing was learned about the upstream
+            upstream.breaker.release_trial()
+            upstream.count("rejected")
+            record_upstream_error(provider, model_name, "deadline_exceeded")
+            raise UpstreamUnavailableError(upstream.name, f"Deadline exceeded waiting for the {upstream.name} rate limit.")
+
+        upstream.count("calls")
+        try:
+            with UPSTREAM_CALLS_IN_FLIGHT.track(provider=provider, model=model_name):
+                result = attempt_call(max(1.0, deadline - time.monotonic()))
+        except Exception as e:
+            record_upstream_error(provider, model_name, error_reason(e))
+            if not is_retryable(e):
+                # The upstream answered; the request itself was bad
+                upstream.breaker.record_success()
+                raise
+            upstream.breaker.record_failure()
+            upstream.count("failures")
+            delay = backoff_delay(attempt)
+            if attempt >= config.UPSTREAM_MAX_ATTEMPTS or time.monotonic() + delay >= deadline:
+                raise UpstreamUnavailableError(
+                    upstream.name,
+                    f"{upstream.name} failed after {attempt} attempt(s): {e}",
+                    retry_after=delay
+                ) from e
+            logger.warning(
+                "Retryable error from %s (attempt %d/%d), retrying in %.1fs: %s",
+                upstream.name, attempt, config.UPSTREAM_MAX_ATTEMPTS, delay, e
+            )
+            upstream.count("retries")
+            time.sleep(delay)
+            record_stage("retry_backoff", delay)
+        else:
+            upstream.breaker.record_success()
+            return result
+
+def upstream_stats() -> dict:
+    """Rate limit, circuit and retry counters for every upstream used so far."""
+    with _upstreams_lock:
+        upstreams = list(_upstreams.values())
+    return {upstream.name: upstream.stats() for upstream in upstreams}
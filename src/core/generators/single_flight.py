@@ -0,0 +1,79 @@
+import threading
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls: while a call for a key is in flight, later
+    callers with the same key wait for it and receive its result (or its exception)
+    instead of starting their own. Safe to share between threads.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.executed = 0
+        self.coalesced = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, func):
+        """
+        Runs func() unless a call for key is already in flight, in which case it
+        waits for that call instead.
+
+        Returns:
+            The result of the (shared) call.
+
+        Raises:
+            Exception: Whatever the shared call raised.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"executed": self.executed, "coalesced": self.coalesced, "in_flight": len(self._calls)}
+
+_groups = {}
+_groups_lock = threading.Lock()
+
+def get_single_flight(name: str) -> SingleFlight:
+    """Returns the process-wide coalescing group for a call type ("text", "vision", "image")."""
+    with _groups_lock:
+        group = _groups.get(name)
+        if group is None:
+            group = _groups[name] = SingleFlight(name)
+    return group
+
+def single_flight_stats() -> dict:
+    """Executed and coalesced (saved) upstream calls per group."""
+    with _groups_lock:
+        groups = list(_groups.values())
+    return {group.name: group.stats() for group in groups}
@@ -1,4 +1,4 @@
-import google.generativeai as genai
+import functools
 import os
 import sys
 
@@ -8,11 +8,22 @@ if project_root not in sys.path:
 
 try:
     import config
+    from src.core.generators.executor import run_blocking, iterate_blocking
+    from src.core.generators.client_registry import get_backend
+    from src.core.generators.backends.base import KIND_TEXT
+    from src.core.generators.resilience import call_upstream, UpstreamUnavailableError, PROVIDER_GEMINI
+    from src.core.generators.single_flight import get_single_flight
+    from src.core.cache.response_cache import get_text_cache, make_cache_key
+    from src.core.utils.stage_timing import stage_timer
+    from src.core.utils.structured_logging import get_logger, log_prompt
 except ImportError:
     print("Error: config.py not found. Ensure it exists in the project root.")
     sys.exit(1)
 
-def generate_text_response(system_prompt: str, user_prompt: str, model_name: str = config.DEFAULT_GEMINI_FLASH_MODEL):
+logger = get_logger("text")
+
+def generate_text_response(system_prompt: str, user_prompt: str, model_name: str = config.DEFAULT_GEMINI_FLASH_MODEL,
+                           generation_config: dict = None, use_cache: bool = True, validate=None):
     """
     Generates a text response using a Gemini model based on system and user prompts.
 
@@ -20,39 +31,155 @@ def generate_text_response(system_prompt: str, user_prompt: str, model_name: str
         system_prompt: Instructions or context for the model's behavior/role.
         user_prompt: The specific query or task for the model.
         model_name: The Gemini model to use (defaults to config.DEFAULT_GEMINI_PRO_MODEL).
+        generation_config: Optional generation settings (temperature, max_output_tokens, ...).
+        use_cache: Set to False to bypass the response cache and force a fresh generation
+            (the new result still replaces the cached one).
+        validate: Optional predicate on the answer. Answers it rejects are returned but
+            not cached, and cached answers it rejects are regenerated.
 
     Returns:
         The text response from the model, or None if an error occurs.
+
+    Raises:
+        ValueError: If the API key is missing.
+        UpstreamUnavailableError: If Gemini is rate limited or degraded beyond the retry budget.
     """
-    if not config.GOOGLE_API_KEY:
-        raise ValueError("API key not found. Please check your .env file and config.py.")
+    request_key = make_cache_key(system_prompt, user_prompt, model_name, **(generation_config or {}))
+    cache_key = request_key if config.RESPONSE_CACHE_ENABLED else None
+    if cache_key is not None and use_cache:
+        cached = get_text_cache().get(cache_key)
+        if cached is not None and (validate is None or validate(cached)):
+            logger.debug("Text cache hit", extra={"model": model_name, "cache_key": cache_key[:12]})
+            return cached
 
-    genai.configure(api_key=config.GOOGLE_API_KEY)
+    # Identical requests already in flight share that call instead of starting their own
+    return get_single_flight("text").do(
+        request_key,
+        functools.partial(_generate_uncached, system_prompt, user_prompt, model_name, generation_config, cache_key, validate)
+    )
 
-    print(f"Using model: {model_name}")
-    print(f"System Prompt: {system_prompt}")
-    print(f"User Prompt: {user_prompt}")
+def _generate_uncached(system_prompt: str, user_prompt: str, model_name: str, generation_config: dict, cache_key: str,
+                       validate=None):
+    """Calls Gemini for generate_text_response and stores a successful, valid answer under cache_key."""
+    logger.debug("Generating text", extra={"model": model_name, "prompt_chars": len(system_prompt) + len(user_prompt)})
+    log_prompt(logger, "User prompt", user_prompt, model=model_name)
+
+    backend = get_backend()
+    # Raises ValueError if the API key is missing
+    backend.ensure_ready(KIND_TEXT)
 
     try:
-        model = genai.GenerativeModel(
-            model_name,
-            # System instruction can be set here for models that support it
-            # system_instruction=system_prompt
+        # The static system prompt goes out as a system instruction, so the backend can
+        # cache it as context and only the user prompt varies between calls.
+        # Rate limited, retried with backoff and bounded by a deadline
+        with stage_timer("text_model"):
+            text = call_upstream(
+                PROVIDER_GEMINI,
+                model_name,
+                lambda timeout: backend.generate_text(
+                    model_name, user_prompt, generation_config, timeout, system_instruction=system_prompt
+                )
             )
-        # Combine prompts for models that don't use system_instruction directly
-        # Or structure as a conversation history if needed
-        full_prompt = f"{system_prompt}\n\nUser Query:\n{user_prompt}"
-        response = model.generate_content(full_prompt) # Or potentially pass as a list of messages
 
-        if not response.parts:
-            print("Warning: Received an empty response. This might be due to safety filters.")
-            print(f"Prompt Feedback: {response.prompt_feedback}")
-            return None
-        if response.candidates and response.candidates[0].finish_reason.name != "STOP":
-             print(f"Warning: Generation finished unexpectedly. Reason: {response.candidates[0].finish_reason.name}")
-
-        return response.text
+        if cache_key is not None and text and (validate is None or validate(text)):
+            get_text_cache().set(cache_key, text)
+        return text
 
+    except UpstreamUnavailableError:
+        raise
     except Exception as e:
-        print(f"An error occurred during text generation: {e}")
+        logger.error("Text generation failed: %s", e, extra={"model": model_name})
         return None
+
+async def generate_text_response_async(system_prompt: str, user_prompt: str, model_name: str = config.DEFAULT_GEMINI_FLASH_MODEL,
+                                       generation_config: dict = None, use_cache: bool = True, validate=None):
+    """
+    Async variant of generate_text_response.
+
+    Runs the blocking Gemini call on the dedicated generator executor so the
+    event loop stays free to serve other requests while the model responds.
+    """
+    return await run_blocking(
+        generate_text_response,
+        system_prompt=system_prompt,
+        user_prompt=user_prompt,
+        model_name=model_name,
+        generation_config=generation_config,
+        use_cache=use_cache,
+        validate=validate
+    )
+
+def stream_text_response(system_prompt: str, user_prompt: str, model_name: str = config.DEFAULT_GEMINI_FLASH_MODEL,
+                         generation_config: dict = None, use_cache: bool = True):
+    """
+    Streaming variant of generate_text_response: yields text chunks as the model produces them.
+
+    A cached response is yielded as a single chunk. The complete text is stored in the
+    response cache once the stream finishes normally.
+
+    Args:
+        system_prompt: Instructions or context for the model's behavior/role.
+        user_prompt: The specific query or task for the model.
+        model_name: The Gemini model to use.
+        generation_config: Optional generation settings (temperature, max_output_tokens, ...).
+        use_cache: Set to False to bypass the response cache.
+
+    Yields:
+        Text chunks, in order.
+
+    Raises:
+        ValueError: If the API key is missing.
+        UpstreamUnavailableError: If Gemini is rate limited or degraded beyond the retry budget.
+        Exception: Other upstream errors are propagated to the caller.
+    """
+    cache_key = None
+    if config.RESPONSE_CACHE_ENABLED:
+        cache_key = make_cache_key(system_prompt, user_prompt, model_name, **(generation_config or {}))
+        if use_cache:
+            cached = get_text_cache().get(cache_key)
+            if cached is not None:
+                logger.debug("Text cache hit", extra={"model": model_name, "cache_key": cache_key[:12]})
+                yield cached
+                return
+
+    logger.debug("Streaming text", extra={"model": model_name, "prompt_chars": len(system_prompt) + len(user_prompt)})
+    log_prompt(logger, "User prompt", user_prompt, model=model_name)
+
+    backend = get_backend()
+    backend.ensure_ready(KIND_TEXT)
+    # Only opening the stream is retried; an error mid-stream reaches the caller
+    with stage_timer("text_model_first_chunk"):
+        stream = call_upstream(
+            PROVIDER_GEMINI,
+            model_name,
+            lambda timeout: backend.stream_text(
+                model_name, user_prompt, generation_config, timeout, system_instruction=system_prompt
+            )
+        )
+
+    chunks = []
+    for text in stream:
+        chunks.append(text)
+        yield text
+
+    if not stream.completed or not chunks:
+        return
+
+    if cache_key is not None:
+        get_text_cache().set(cache_key, "".join(chunks))
+
+async def stream_text_response_async(system_prompt: str, user_prompt: str, model_name: str = config.DEFAULT_GEMINI_FLASH_MODEL,
+                                     generation_config: dict = None, use_cache: bool = True):
+    """
+    Async variant of stream_text_response; the blocking stream is consumed on the
+    dedicated generator executor and chunks are yielded on the event loop.
+    """
+    async for chunk in iterate_blocking(
+        stream_text_response,
+        system_prompt=system_prompt,
+        user_prompt=user_prompt,
+        model_name=model_name,
+        generation_config=generation_config,
+        use_cache=use_cache
+    ):
+        yield chunk
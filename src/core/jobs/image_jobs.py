@@ -0,0 +1,175 @@
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+import config
+from src.core.generators.text_generator import generate_text_response
+from src.core.cache.image_store import get_or_generate_image
+from src.core.prompts.image_prompt import image_prompt
+from src.core.utils.structured_logging import get_logger, set_request_id
+
+logger = get_logger("jobs")
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+
+_COLUMNS = ("id", "status", "input_text", "image_prompt", "seed", "image_key", "error", "attempts", "regenerate", "created_at", "updated_at")
+
+class ImageJobStore:
+    """SQLite-backed store for image job state. Safe to share between threads."""
+
+    def __init__(self, db_path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS image_jobs ("
+                "id TEXT PRIMARY KEY, status TEXT NOT NULL, input_text TEXT NOT NULL, image_prompt TEXT, "
+                "seed INTEGER, image_key TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, regenerate INTEGER NOT NULL DEFAULT 0, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def create(self, input_text: str, seed: int, regenerate: bool = False) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO image_jobs (id, status, input_text, seed, regenerate, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, STATUS_QUEUED, input_text, seed, int(regenerate), now, now)
+            )
+            self._db.commit()
+        return job_id
+
+    def get(self, job_id: str):
+        """Returns the job as a dict, or None if it doesn't exist."""
+        with self._lock:
+            row = self._db.execute(f"SELECT {', '.join(_COLUMNS)} FROM image_jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(zip(_COLUMNS, row)) if row else None
+
+    def update(self, job_id: str, **fields):
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._db.execute(f"UPDATE image_jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+            self._db.commit()
+
+    def unfinished_ids(self) -> list:
+        """Ids of jobs that were queued or running when the process last stopped."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id FROM image_jobs WHERE status IN (?, ?) ORDER BY created_at",
+                (STATUS_QUEUED, STATUS_RUNNING)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+class ImageJobQueue:
+    """
+    Runs image generation jobs on a local worker pool.
+
+    Every step is checkpointed: the generated image prompt is saved in the job store
+    before the image call, and the PNG lands in the content-addressed image store
+    before the job is marked as succeeded, so retries and restarts never redo
+    completed work.
+    """
+
+    def __init__(self, store: ImageJobStore, max_workers: int, max_attempts: int):
+        self.store = store
+        self.max_attempts = max(1, max_attempts)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="linkgenix-image-job")
+
+    def submit(self, input_text: str, seed: int = None, regenerate: bool = False) -> str:
+        """Stores a new job and queues it. Returns the job id."""
+        seed = config.DEFAULT_IMAGE_SEED if seed is None else seed
+        job_id = self.store.create(input_text, seed, regenerate)
+        self._executor.submit(self._process, job_id)
+        return job_id
+
+    def recover(self) -> int:
+        """Re-queues jobs left unfinished by a previous process. Returns how many were queued."""
+        job_ids = self.store.unfinished_ids()
+        for job_id in job_ids:
+            self.store.update(job_id, status=STATUS_QUEUED)
+            self._executor.submit(self._process, job_id)
+        return len(job_ids)
+
+    def shutdown(self, wait: bool = False):
+        self._executor.shutdown(wait=wait)
+
+    def _process(self, job_id: str):
+        # Correlates the records of every stage of this job
+        set_request_id(f"image-job-{job_id}")
+        job = self.store.get(job_id)
+        if job is None or job["status"] == STATUS_SUCCEEDED:
+            return
+
+        attempts = job["attempts"]
+        while attempts < self.max_attempts:
+            attempts += 1
+            self.store.update(job_id, status=STATUS_RUNNING, attempts=attempts)
+            try:
+                generated_image_prompt = job["image_prompt"]
+                if not generated_image_prompt:
+                    generated_image_prompt = generate_text_response(
+                        system_prompt=image_prompt,
+                        user_prompt=job["input_text"],
+                        model_name=config.DEFAULT_GEMINI_PRO_MODEL,
+                        use_cache=not job["regenerate"]
+                    )
+                    if not generated_image_prompt:
+                        raise RuntimeError("Failed to generate image prompt.")
+                    job["image_prompt"] = generated_image_prompt
+                    self.store.update(job_id, image_prompt=generated_image_prompt)
+
+                # Returns immediately if the image store already has this prompt and seed
+                key = get_or_generate_image(generated_image_prompt, seed=job["seed"])
+                self.store.update(job_id, status=STATUS_SUCCEEDED, image_key=key, error=None)
+                return
+            except Exception as e:
+                logger.warning("Image job %s attempt %d/%d failed: %s", job_id, attempts, self.max_attempts, e)
+                self.store.update(job_id, error=str(e))
+                if attempts < self.max_attempts:
+                    time.sleep(config.IMAGE_JOB_RETRY_DELAY_SECONDS * (2 ** (attempts - 1)))
+
+        self.store.update(job_id, status=STATUS_FAILED)
+
+def public_job_view(job: dict) -> dict:
+    """The job fields exposed by the API (no local file paths)."""
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "image_prompt": job["image_prompt"],
+        "seed": job["seed"],
+        "image_url": f"/images/{job['image_key']}" if job["image_key"] else None,
+        "error": job["error"],
+        "attempts": job["attempts"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+
+_queue = None
+_queue_lock = threading.Lock()
+
+def get_image_job_queue() -> ImageJobQueue:
+    """Returns the process-wide image job queue configured from config.py."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = ImageJobQueue(
+                    ImageJobStore(config.IMAGE_JOBS_DB_PATH),
+                    max_workers=config.IMAGE_JOB_WORKERS,
+                    max_attempts=config.IMAGE_JOB_MAX_ATTEMPTS,
+                )
+    return _queue
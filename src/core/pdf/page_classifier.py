@@ -0,0 +1,56 @@
+import os
+import sys
+
+import fitz  # PyMuPDF
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+import config
+
+PAGE_KIND_TEXT = "text"
+PAGE_KIND_VISUAL = "visual"
+
+def _has_tables(page: fitz.Page) -> bool:
+    """Detects tables with PyMuPDF's table finder when the installed version has one."""
+    if not hasattr(page, "find_tables"):
+        return False
+    try:
+        return len(page.find_tables().tables) > 0
+    except Exception:
+        return False
+
+def classify_page(page: fitz.Page) -> dict:
+    """
+    Decides whether a page can be described from its text layer alone or needs the vision model.
+
+    A page is "visual" when it has too little extractable text (scans, slides made of
+    pictures), a figure covering a meaningful share of the page, many vector drawings
+    (charts, diagrams) or a table. Everything else is "text".
+
+    Args:
+        page: The PyMuPDF page to inspect.
+
+    Returns:
+        A dict with "kind" (PAGE_KIND_TEXT or PAGE_KIND_VISUAL), "reason", and
+        "text" (the extracted text layer, stripped).
+    """
+    text = page.get_text("text").strip()
+    page_area = abs(page.rect) or 1.0
+
+    if len(text) < config.PDF_TEXT_MIN_CHARS:
+        return {"kind": PAGE_KIND_VISUAL, "reason": "sparse text layer", "text": text}
+
+    for image_info in page.get_image_info():
+        image_area = abs(fitz.Rect(image_info["bbox"]) & page.rect)
+        if image_area / page_area >= config.PDF_FIGURE_MIN_AREA_RATIO:
+            return {"kind": PAGE_KIND_VISUAL, "reason": "figure", "text": text}
+
+    if len(page.get_drawings()) > config.PDF_MAX_TEXT_PAGE_DRAWINGS:
+        return {"kind": PAGE_KIND_VISUAL, "reason": "vector graphics", "text": text}
+
+    if _has_tables(page):
+        return {"kind": PAGE_KIND_VISUAL, "reason": "table", "text": text}
+
+    return {"kind": PAGE_KIND_TEXT, "reason": "text only", "text": text}
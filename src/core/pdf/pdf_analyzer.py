@@ -0,0 +1,315 @@
+import asyncio
+import hashlib
+import os
+import re
+import sys
+
+import fitz  # PyMuPDF
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+import config
+from src.core.cache.response_cache import get_cache, make_cache_key
+from src.core.generators.executor import iterate_blocking
+from src.core.generators.gemini_generator import ask_gemini_about_image_async, ask_gemini_about_images_async
+from src.core.pdf.page_classifier import classify_page, PAGE_KIND_TEXT
+from src.core.pdf.render_options import build_render_options, encode_pixmap, resolve_dpi
+from src.core.utils.stage_timing import stage_timer
+from src.core.utils.structured_logging import get_logger
+from src.core.prompts.page_analysis_prompt import page_analysis_prompt, batch_page_analysis_prompt, PAGE_ANALYSIS_PROMPT_VERSION
+
+logger = get_logger("pdf")
+
+_BATCH_HEADER_PATTERN = re.compile(r"^\s*=+\s*Page\s+(\d+)\s*=+\s*$", re.MULTILINE | re.IGNORECASE)
+
+SOURCE_TEXT = "text"
+SOURCE_CACHE = "cache"
+SOURCE_VISION = "vision"
+
+# Which prompt described a page: page_analysis_prompt or batch_page_analysis_prompt
+PROMPT_MODE_SINGLE = "single"
+PROMPT_MODE_BATCH = "batch"
+
+class EmptyPDFError(ValueError):
+    """Raised when an uploaded PDF contains no pages."""
+
+def _page_fingerprint(pix: fitz.Pixmap, dpi: int, render_options: dict, model_name: str) -> str:
+    """
+    Fingerprints a rendered page by its pixels, the render DPI and upload encoding, the
+    analysis prompt version and the model, so identical pages in any upload share one
+    cached description.
+    """
+    pixels_digest = hashlib.sha256(pix.samples).hexdigest()
+    return make_cache_key(
+        "pdf-page", pixels_digest, pix.width, pix.height, dpi,
+        render_options["image_format"], render_options["image_quality"],
+        PAGE_ANALYSIS_PROMPT_VERSION, model_name
+    )
+
+def _description_key(fingerprint: str, prompt_mode: str) -> str:
+    """Page cache key of a description: the page fingerprint and the prompt that produced it."""
+    return make_cache_key("pdf-page-description", fingerprint, prompt_mode)
+
+def _cached_description(page_cache, fingerprint: str, prompt_mode: str):
+    """
+    Looks up a page description for prompt_mode. Batched runs also accept a single-page
+    description, which is at least as detailed; single-page runs never use batched ones.
+    """
+    modes = [prompt_mode] if prompt_mode == PROMPT_MODE_SINGLE else [prompt_mode, PROMPT_MODE_SINGLE]
+    for mode in modes:
+        description = page_cache.get(_description_key(fingerprint, mode))
+        if description is not None:
+            return description
+    return None
+
+def _format_page(page_number: int, description: str) -> str:
+    return f"--- Page {page_number} ---\n{description}\n"
+
+def iter_rendered_pages(pdf_bytes: bytes, model_name: str, use_cache: bool = True, text_fast_path: bool = True,
+                        render_options: dict = None, batch_size: int = 1):
+    """
+    Opens a PDF from memory and prepares its pages one at a time, in page order.
+
+    Text-only pages (see page_classifier.classify_page) are described from their text
+    layer when text_fast_path is on, and pages whose fingerprint is in the page cache
+    from the cache. The remaining pages are rasterized at the DPI chosen by the
+    resolution policy and encoded straight to in-memory blobs; nothing is written to
+    disk. PyMuPDF documents are not thread-safe, so the generator must be consumed by
+    a single thread (see open_pdf_pages).
+
+    Args:
+        pdf_bytes: The raw bytes of the uploaded PDF.
+        model_name: The vision model the pages will be sent to (part of the fingerprint).
+        use_cache: Set to False to ignore cached page descriptions.
+        text_fast_path: Set to False to send every page to the vision model.
+        render_options: Resolution and encoding settings from render_options.build_render_options
+            (defaults to the config.py settings).
+        batch_size: Pages per Gemini request the pages will be sent with; selects which
+            prompt's cached descriptions are reused.
+
+    Yields:
+        First the page count, then one dict per page with "index" and "source":
+        "text" and "cache" pages carry their "description", "vision" pages the
+        "fingerprint" and encoded "blob" still to analyze.
+
+    Raises:
+        EmptyPDFError: If the document has no pages.
+    """
+    render_options = render_options or build_render_options()
+    page_cache = get_cache("pdf_pages")
+    use_page_cache = config.RESPONSE_CACHE_ENABLED and use_cache
+    prompt_mode = PROMPT_MODE_BATCH if batch_size_for(batch_size) > 1 else PROMPT_MODE_SINGLE
+
+    with stage_timer("pdf_render"), fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        if len(doc) == 0:
+            raise EmptyPDFError("The uploaded PDF has no pages.")
+        yield len(doc)
+
+        for i, page in enumerate(doc):
+            if text_fast_path:
+                classification = classify_page(page)
+                if classification["kind"] == PAGE_KIND_TEXT:
+                    yield {"index": i, "source": SOURCE_TEXT, "description": classification["text"]}
+                    continue
+
+            dpi = resolve_dpi(page, render_options)
+            with stage_timer("pdf_rasterize"):
+                pix = page.get_pixmap(dpi=dpi)
+            fingerprint = _page_fingerprint(pix, dpi, render_options, model_name)
+
+            cached_description = _cached_description(page_cache, fingerprint, prompt_mode) if use_page_cache else None
+            if cached_description is not None:
+                yield {"index": i, "source": SOURCE_CACHE, "description": cached_description}
+                continue
+
+            with stage_timer("page_encode"):
+                blob = encode_pixmap(pix, render_options)
+            yield {"index": i, "source": SOURCE_VISION, "fingerprint": fingerprint, "blob": blob}
+
+async def open_pdf_pages(pdf_bytes: bytes, model_name: str, use_cache: bool = True, text_fast_path: bool = True,
+                         render_options: dict = None, batch_size: int = 1) -> tuple:
+    """
+    Starts preparing the pages of a PDF in the generator executor (see iter_rendered_pages)
+    and returns as soon as the document is open, so callers can work on the first pages
+    while later ones are still rendering.
+
+    Returns:
+        (page count, async iterator of the rendered page dicts in page order).
+
+    Raises:
+        EmptyPDFError: If the document has no pages.
+        fitz.FileDataError: If the bytes are not a valid PDF.
+    """
+    pages = iterate_blocking(iter_rendered_pages, pdf_bytes, model_name, use_cache, text_fast_path, render_options, batch_size)
+    page_count = await pages.__anext__()
+    return page_count, pages
+
+async def describe_page(semaphore: asyncio.Semaphore, page: dict, page_count: int, model_name: str) -> str:
+    """
+    Analyzes a single rendered page with Gemini, holding a slot of the shared semaphore.
+    Errors are kept local to the page so one failure doesn't abort the whole document.
+    Successful descriptions are stored in the page cache under the page fingerprint
+    and the single-page prompt mode.
+    """
+    page_number = page["index"] + 1
+    prompt = page_analysis_prompt.format(page_number=page_number, page_count=page_count)
+    async with semaphore:
+        try:
+            description = await ask_gemini_about_image_async(
+                image=page["blob"],
+                text_prompt=prompt,
+                model_name=model_name
+            )
+            if description:
+                if config.RESPONSE_CACHE_ENABLED:
+                    get_cache("pdf_pages").set(_description_key(page["fingerprint"], PROMPT_MODE_SINGLE), description)
+                return _format_page(page_number, description)
+            return _format_page(page_number, "[No description returned from Gemini]")
+        except Exception as gemini_error:
+            logger.error("Error processing page %d with Gemini: %s", page_number, gemini_error)
+            return _format_page(page_number, f"[Error analyzing page: {gemini_error}]")
+
+def batch_size_for(batch_size: int) -> int:
+    """
+    Returns the number of pages to pack into one multi-page request: batch_size
+    (1 disables batching), capped so that the estimated tokens of a batch (image input
+    plus expected description output per page) stay within config.PDF_BATCH_TOKEN_BUDGET.
+    """
+    tokens_per_page = config.GEMINI_IMAGE_TOKENS + config.PDF_BATCH_OUTPUT_TOKENS_PER_PAGE
+    max_by_budget = max(1, config.PDF_BATCH_TOKEN_BUDGET // tokens_per_page)
+    return max(1, min(batch_size, max_by_budget))
+
+def split_batch_response(text: str, page_numbers: list) -> dict:
+    """
+    Splits a batched answer into per-page descriptions using its "=== Page N ===" headers.
+
+    Returns:
+        A dict {page number: description} holding only the requested pages that were
+        found with a non-empty description.
+    """
+    sections = {}
+    headers = list(_BATCH_HEADER_PATTERN.finditer(text or ""))
+    for position, header in enumerate(headers):
+        page_number = int(header.group(1))
+        end = headers[position + 1].start() if position + 1 < len(headers) else len(text)
+        description = text[header.end():end].strip()
+        if page_number in page_numbers and description and page_number not in sections:
+            sections[page_number] = description
+    return sections
+
+async def describe_page_batch(semaphore: asyncio.Semaphore, pages: list, page_count: int, model_name: str) -> dict:
+    """
+    Analyzes several pages in one Gemini request and splits the answer back per page.
+
+    Pages the model skipped (or the whole batch, if the request fails) fall back to
+    single-page analysis, so errors stay isolated per page as in the unbatched path.
+
+    Returns:
+        A dict {page index: formatted "--- Page N ---" section}.
+    """
+    if len(pages) == 1:
+        return {pages[0]["index"]: await describe_page(semaphore, pages[0], page_count, model_name)}
+
+    page_numbers = [page["index"] + 1 for page in pages]
+    prompt = batch_page_analysis_prompt.format(batch_size=len(pages), page_count=page_count)
+    async with semaphore:
+        try:
+            answer = await ask_gemini_about_images_async(
+                images=[page["blob"] for page in pages],
+                text_prompt=prompt,
+                labels=[f"Page {page_number}:" for page_number in page_numbers],
+                model_name=model_name
+            )
+        except Exception as gemini_error:
+            logger.error("Error processing pages %s with Gemini: %s", page_numbers, gemini_error)
+            answer = None
+
+    sections = split_batch_response(answer, page_numbers)
+    results = {}
+    missing = []
+    for page in pages:
+        description = sections.get(page["index"] + 1)
+        if description is None:
+            missing.append(page)
+            continue
+        if config.RESPONSE_CACHE_ENABLED:
+            get_cache("pdf_pages").set(_description_key(page["fingerprint"], PROMPT_MODE_BATCH), description)
+        results[page["index"]] = _format_page(page["index"] + 1, description)
+
+    if missing:
+        logger.warning("Batched answer is missing %d of %d pages; analyzing them individually.", len(missing), len(pages))
+        retried = await asyncio.gather(*[describe_page(semaphore, page, page_count, model_name) for page in missing])
+        for page, description in zip(missing, retried):
+            results[page["index"]] = description
+    return results
+
+async def iter_page_descriptions(pages, page_count: int, batch_size: int = config.PDF_BATCH_SIZE,
+                                 model_name: str = config.DEFAULT_GEMINI_FLASH_MODEL):
+    """
+    Yields page descriptions as soon as each one is available, while later pages are
+    still rendering.
+
+    Text-layer and cached pages are yielded as they arrive. Vision pages are grouped
+    into batches of batch_size_for(batch_size) in page order, and each batch is sent
+    as soon as it is full; batches run concurrently (bounded by
+    config.PDF_ANALYSIS_CONCURRENCY) and are yielded in completion order, not page order.
+
+    Args:
+        pages: Async iterator of rendered pages, as returned by open_pdf_pages.
+        page_count: Number of pages in the document.
+        batch_size: Pages per Gemini request (1 sends one request per page).
+        model_name: The Gemini vision model to use.
+
+    Yields:
+        (page index, formatted "--- Page N ---" section, source) tuples, where source is
+        "text", "cache" or "vision".
+
+    Raises:
+        Any error raised while rendering the remaining pages.
+    """
+    size = batch_size_for(batch_size)
+    semaphore = asyncio.Semaphore(max(1, config.PDF_ANALYSIS_CONCURRENCY))
+    ready = asyncio.Queue()
+    finished = object()
+    tasks = []
+
+    async def describe(batch):
+        results = await describe_page_batch(semaphore, batch, page_count, model_name)
+        for i, description in sorted(results.items()):
+            ready.put_nowait((i, description, SOURCE_VISION))
+
+    async def feed():
+        try:
+            batch = []
+            async for page in pages:
+                if page["source"] != SOURCE_VISION:
+                    ready.put_nowait((page["index"], _format_page(page["index"] + 1, page["description"]), page["source"]))
+                    continue
+                batch.append(page)
+                if len(batch) == size:
+                    tasks.append(asyncio.ensure_future(describe(batch)))
+                    batch = []
+            if batch:
+                tasks.append(asyncio.ensure_future(describe(batch)))
+            await asyncio.gather(*tasks)
+        except Exception as e:
+            ready.put_nowait((finished, e, None))
+        else:
+            ready.put_nowait((finished, None, None))
+
+    feeder = asyncio.ensure_future(feed())
+    try:
+        while True:
+            item = await ready.get()
+            if item[0] is finished:
+                if item[1] is not None:
+                    raise item[1]
+                break
+            yield item
+    finally:
+        # The consumer may stop early (e.g. a streaming client disconnects); this also stops rendering
+        feeder.cancel()
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,99 @@
+import os
+import sys
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+import config
+from src.core.utils.image_encoding import encode_image, normalize_image_format
+
+RESOLUTION_FIXED = "fixed"
+RESOLUTION_LONG_EDGE = "long_edge"
+RESOLUTION_AUTO = "auto"
+RESOLUTION_POLICIES = (RESOLUTION_FIXED, RESOLUTION_LONG_EDGE, RESOLUTION_AUTO)
+
+def build_render_options(resolution: str = None, dpi: int = None, long_edge: int = None,
+                         image_format: str = None, image_quality: int = None) -> dict:
+    """
+    Validates per-request rasterization settings, filling gaps from config.py.
+
+    Args:
+        resolution: "fixed" (use dpi), "long_edge" (scale the longest side to long_edge pixels)
+            or "auto" (pick a size from the page dimensions and text density).
+        dpi: Resolution for the "fixed" policy.
+        long_edge: Target longest side in pixels for the "long_edge" policy.
+        image_format: "png", "jpeg" or "webp".
+        image_quality: Lossy quality (1-100) for JPEG and WebP.
+
+    Returns:
+        A dict with "resolution", "dpi", "long_edge", "image_format" and "image_quality".
+
+    Raises:
+        ValueError: If a setting is out of range or unknown.
+    """
+    resolution = (resolution or config.PDF_RESOLUTION_POLICY).lower()
+    if resolution not in RESOLUTION_POLICIES:
+        raise ValueError(f"Unknown resolution policy '{resolution}'. Choose one of: {', '.join(RESOLUTION_POLICIES)}.")
+
+    dpi = config.DEFAULT_PDF_DPI if dpi is None else dpi
+    long_edge = config.PDF_TARGET_LONG_EDGE if long_edge is None else long_edge
+    image_quality = config.PDF_IMAGE_QUALITY if image_quality is None else image_quality
+    if not config.PDF_MIN_DPI <= dpi <= config.PDF_MAX_DPI:
+        raise ValueError(f"dpi must be between {config.PDF_MIN_DPI} and {config.PDF_MAX_DPI}.")
+    if long_edge < 256:
+        raise ValueError("long_edge must be at least 256 pixels.")
+    if not 1 <= image_quality <= 100:
+        raise ValueError("image_quality must be between 1 and 100.")
+
+    return {
+        "resolution": resolution,
+        "dpi": dpi,
+        "long_edge": long_edge,
+        "image_format": normalize_image_format(image_format or config.PDF_IMAGE_FORMAT),
+        "image_quality": image_quality,
+    }
+
+def _dpi_for_long_edge(page: fitz.Page, long_edge: int) -> float:
+    longest_side_points = max(page.rect.width, page.rect.height) or 1.0
+    return long_edge * 72.0 / longest_side_points
+
+def resolve_dpi(page: fitz.Page, options: dict) -> int:
+    """
+    Picks the render DPI for a page according to the resolution policy.
+
+    The "auto" policy targets config.PDF_TARGET_LONG_EDGE pixels on the longest side and
+    raises it to config.PDF_DENSE_TEXT_LONG_EDGE for pages packed with small print, so
+    slides are not over-rendered while dense pages stay legible.
+    """
+    if options["resolution"] == RESOLUTION_FIXED:
+        dpi = options["dpi"]
+    elif options["resolution"] == RESOLUTION_LONG_EDGE:
+        dpi = _dpi_for_long_edge(page, options["long_edge"])
+    else:
+        page_area = abs(page.rect) or 1.0
+        chars_per_square_inch = len(page.get_text("text")) / (page_area / (72.0 * 72.0))
+        target = options["long_edge"]
+        if chars_per_square_inch >= config.PDF_DENSE_TEXT_CHARS_PER_SQ_INCH:
+            target = max(target, config.PDF_DENSE_TEXT_LONG_EDGE)
+        dpi = _dpi_for_long_edge(page, target)
+
+    return int(max(config.PDF_MIN_DPI, min(config.PDF_MAX_DPI, round(dpi))))
+
+def encode_pixmap(pix: fitz.Pixmap, options: dict) -> dict:
+    """
+    Encodes a rendered page for upload using the requested format and quality.
+
+    Returns:
+        An in-memory blob {"mime_type": ..., "data": bytes} accepted by the Gemini SDK.
+    """
+    if options["image_format"] == "png":
+        return {"mime_type": "image/png", "data": pix.tobytes("png")}
+
+    mode = "RGBA" if pix.alpha else "RGB"
+    image = Image.frombytes(mode, (pix.width, pix.height), pix.samples)
+    data, mime_type = encode_image(image, options["image_format"], options["image_quality"])
+    return {"mime_type": mime_type, "data": data}
@@ -0,0 +1,88 @@
+import asyncio
+import os
+import sys
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+import config
+from src.core.pipeline.post_pipeline import run_post_pipeline, PipelineStageError, MODE_STAGED
+from src.core.pipeline.scheduler import get_scheduler
+from src.core.utils.structured_logging import get_logger
+
+logger = get_logger("batch")
+
+STATUS_OK = "ok"
+STATUS_ERROR = "error"
+
+async def _run_job(index: int, job: dict, use_cache: bool, scheduler) -> dict:
+    """Runs one batch job through the pipeline and reports its status instead of raising."""
+    started = time.perf_counter()
+    item = {"index": index, "id": job.get("id") or str(index), "status": STATUS_OK, "result": None, "error": None}
+    try:
+        item["result"] = await run_post_pipeline(
+            user_query=job["user_query"],
+            reference_content=job.get("reference_content") or "",
+            stages=job.get("stages"),
+            mode=job.get("mode") or MODE_STAGED,
+            use_cache=use_cache,
+            model_name=job.get("model_name") or config.DEFAULT_GEMINI_PRO_MODEL,
+            scheduler=scheduler,
+            document_id=job.get("document_id"),
+            top_k=job.get("top_k")
+        )
+    except PipelineStageError as stage_error:
+        item.update(status=STATUS_ERROR, error=f"Failed at stage '{stage_error.stage}': {stage_error}")
+    except Exception as e:
+        logger.error("Error in batch job %s: %s", item["id"], e)
+        item.update(status=STATUS_ERROR, error=str(e))
+    item["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+    return item
+
+async def iter_batch_results(jobs: list, use_cache: bool = True):
+    """
+    Runs many pipeline jobs concurrently under the shared scheduler's global and
+    per-model limits, yielding each job's outcome as soon as it completes.
+
+    Args:
+        jobs: Dicts with "user_query" and optional "id", "reference_content", "stages",
+            "mode", "model_name", "document_id" and "top_k".
+        use_cache: Set to False to bypass the response cache.
+
+    Yields:
+        Dicts with "index", "id", "status" ("ok" or "error"), "result", "error"
+        and "elapsed_seconds", in completion order.
+    """
+    scheduler = get_scheduler()
+    tasks = [asyncio.ensure_future(_run_job(i, job, use_cache, scheduler)) for i, job in enumerate(jobs)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def run_batch(jobs: list, use_cache: bool = True) -> dict:
+    """
+    Runs a batch and aggregates the outcomes.
+
+    Returns:
+        A dict with "results" (in submission order) and "summary" (counts and wall time).
+    """
+    started = time.perf_counter()
+    results = [None] * len(jobs)
+    async for item in iter_batch_results(jobs, use_cache):
+        results[item["index"]] = item
+
+    succeeded = sum(1 for item in results if item["status"] == STATUS_OK)
+    return {
+        "results": results,
+        "summary": {
+            "total": len(jobs),
+            "succeeded": succeeded,
+            "failed": len(jobs) - succeeded,
+            "elapsed_seconds": round(time.perf_counter() - started, 3),
+        },
+    }
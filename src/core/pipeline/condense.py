@@ -0,0 +1,200 @@
+import asyncio
+import functools
+import math
+import os
+import re
+import sys
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+import config
+from src.core.generators.text_generator import generate_text_response_async
+from src.core.prompts.condense_prompt import condense_prompt
+from src.core.utils.stage_timing import stage_timer
+from src.core.utils.structured_logging import get_logger
+
+logger = get_logger("condense")
+
+# "--- Page 3 ---" (pdf_analyzer sections) or "--- Pages 1-5 ---" (condensed groups)
+_SECTION_HEADER_PATTERN = re.compile(r"^--- Pages? (\d+)(?:-(\d+))? ---$", re.MULTILINE)
+
+REFERENCE_MARKER = "\n\nReference Content:\n"
+
+# Summaries are asked for in words; English text runs about 0.75 words per token
+_WORDS_PER_TOKEN = 0.75
+_MIN_SUMMARY_TOKENS = 100
+
+def estimate_tokens(text: str) -> int:
+    """Estimates the token count of text from its length (config.CHARS_PER_TOKEN)."""
+    return math.ceil(len(text or "") / config.CHARS_PER_TOKEN)
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    max_chars = int(max_tokens * config.CHARS_PER_TOKEN)
+    return text if len(text) <= max_chars else text[:max(0, max_chars - 6)].rstrip() + " [...]"
+
+def split_sections(text: str) -> list:
+    """
+    Splits an analysis into its page sections.
+
+    Returns:
+        A list of {"first", "last", "text"} dicts, where first/last are the page range
+        of the section (None for text before the first header or without headers).
+    """
+    headers = list(_SECTION_HEADER_PATTERN.finditer(text or ""))
+    sections = []
+    preamble = (text or "")[:headers[0].start() if headers else None].strip()
+    if preamble:
+        sections.append({"first": None, "last": None, "text": preamble})
+    for position, header in enumerate(headers):
+        end = headers[position + 1].start() if position + 1 < len(headers) else len(text)
+        body = text[header.end():end].strip()
+        if body:
+            first = int(header.group(1))
+            sections.append({"first": first, "last": int(header.group(2) or first), "text": body})
+    return sections
+
+def _section_header(first: int, last: int) -> str:
+    if first is None:
+        return ""
+    return f"--- Page {first} ---\n" if first == last else f"--- Pages {first}-{last} ---\n"
+
+def _format_sections(sections: list) -> str:
+    return "\n".join(_section_header(section["first"], section["last"]) + section["text"] + "\n" for section in sections)
+
+def _split_oversized(section: dict, max_tokens: int) -> list:
+    """Cuts a section longer than max_tokens into pieces, at line breaks where possible."""
+    max_chars = max(1, int(max_tokens * config.CHARS_PER_TOKEN))
+    text = section["text"]
+    pieces = []
+    while len(text) > max_chars:
+        cut = text.rfind("\n", 0, max_chars)
+        if cut <= 0:
+            cut = max_chars
+        pieces.append({**section, "text": text[:cut].strip()})
+        text = text[cut:].strip()
+    if text:
+        pieces.append({**section, "text": text})
+    return pieces
+
+def group_sections(sections: list, max_tokens: int) -> list:
+    """Packs consecutive sections into groups of at most max_tokens estimated tokens each."""
+    groups = []
+    current = []
+    current_tokens = 0
+    for section in sections:
+        for piece in _split_oversized(section, max_tokens):
+            tokens = estimate_tokens(piece["text"])
+            if current and current_tokens + tokens > max_tokens:
+                groups.append(current)
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+def _page_range(group: list) -> tuple:
+    pages = [section for section in group if section["first"] is not None]
+    if not pages:
+        return None, None
+    return min(section["first"] for section in pages), max(section["last"] for section in pages)
+
+async def _summarize_group(semaphore: asyncio.Semaphore, group: list, target_tokens: int, model_name: str,
+                           use_cache: bool, scheduler=None) -> dict:
+    """
+    Summarizes one group of sections into a single section covering its page range,
+    holding a scheduler slot for the model when a scheduler is given.
+    If the model returns nothing, the group text is truncated to the target instead.
+    """
+    first, last = _page_range(group)
+    text = _format_sections(group)
+    call = functools.partial(
+        generate_text_response_async,
+        system_prompt=condense_prompt,
+        user_prompt=f"Maximum length: {int(target_tokens * _WORDS_PER_TOKEN)} words\n\n{text}",
+        model_name=model_name,
+        use_cache=use_cache
+    )
+    async with semaphore:
+        if scheduler is None:
+            summary = await call()
+        else:
+            async with scheduler.slot(model_name):
+                summary = await call()
+    if not summary:
+        logger.warning("Summarizing pages %s-%s returned nothing; truncating them instead.", first, last)
+        summary = _truncate_to_tokens(text, target_tokens)
+    return {"first": first, "last": last, "text": summary.strip()}
+
+async def condense_reference(text: str, token_budget: int = None, model_name: str = None, use_cache: bool = True,
+                             scheduler=None) -> dict:
+    """
+    Shrinks reference content to fit a token budget, map-reduce style.
+
+    The page sections are packed into groups of config.CONDENSE_GROUP_TOKENS, every
+    group is summarized concurrently (at most config.CONDENSE_CONCURRENCY calls at a
+    time) into its share of the budget, and the summaries, which keep their page
+    ranges, are joined. If the result is still over budget, the summaries are
+    grouped and summarized again, up to config.CONDENSE_MAX_ROUNDS rounds, and
+    finally truncated.
+
+    Args:
+        text: The reference content, e.g. an /analyze-pdf/ analysis.
+        token_budget: Maximum estimated tokens (defaults to config.CONDENSE_TOKEN_BUDGET;
+            0 returns the text unchanged).
+        model_name: The Gemini model used for summaries (defaults to config.CONDENSE_MODEL).
+        use_cache: Set to False to bypass the response cache for the summaries.
+        scheduler: Optional scheduler.ConcurrencyScheduler; each summary then also holds
+            one of its slots for model_name, so batches stay within their limits.
+
+    Returns:
+        A dict with "text", "original_tokens", "tokens" (both estimated) and "rounds"
+        (0 if the text already fit).
+
+    Raises:
+        ValueError: If the API key is missing.
+        UpstreamUnavailableError: If Gemini is rate limited or degraded beyond the retry budget.
+    """
+    budget = config.CONDENSE_TOKEN_BUDGET if token_budget is None else token_budget
+    original_tokens = estimate_tokens(text)
+    result = {"text": text, "original_tokens": original_tokens, "tokens": original_tokens, "rounds": 0}
+    if budget <= 0 or original_tokens <= budget:
+        return result
+
+    model_name = model_name or config.CONDENSE_MODEL
+    semaphore = asyncio.Semaphore(max(1, config.CONDENSE_CONCURRENCY))
+    sections = split_sections(text)
+    condensed = text
+    with stage_timer("condense"):
+        for round_number in range(1, max(1, config.CONDENSE_MAX_ROUNDS) + 1):
+            groups = group_sections(sections, config.CONDENSE_GROUP_TOKENS)
+            target_tokens = max(_MIN_SUMMARY_TOKENS, budget // len(groups))
+            sections = await asyncio.gather(*[
+                _summarize_group(semaphore, group, target_tokens, model_name, use_cache, scheduler) for group in groups
+            ])
+            condensed = _format_sections(sections)
+            result["rounds"] = round_number
+            if estimate_tokens(condensed) <= budget:
+                break
+
+    condensed = _truncate_to_tokens(condensed, budget)
+    logger.info(
+        "Condensed reference content from %d to %d estimated tokens in %d round(s).",
+        original_tokens, estimate_tokens(condensed), result["rounds"]
+    )
+    result.update(text=condensed, tokens=estimate_tokens(condensed))
+    return result
+
+async def condense_generation_input(user_input: str, token_budget: int = None, use_cache: bool = True) -> str:
+    """
+    Condenses the "Reference Content" part of a generation input built like
+    build_generation_input (the layout the frontend posts to /generate-content/).
+    Inputs without that part are returned unchanged.
+    """
+    head, marker, reference = user_input.partition(REFERENCE_MARKER)
+    if not marker:
+        return user_input
+    condensed = await condense_reference(reference, token_budget, use_cache=use_cache)
+    return head + marker + condensed["text"]
@@ -0,0 +1,217 @@
+import functools
+import os
+import sys
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+import config
+from src.core.generators.executor import run_blocking
+from src.core.generators.text_generator import generate_text_response_async
+from src.core.pipeline.condense import condense_reference
+from src.core.retrieval.page_index import get_page_index
+from src.core.prompts.content_creation_prompt import content_prompt
+from src.core.prompts.formatter_prompt import formatting_prompt
+from src.core.prompts.seo_prompt import seo_prompt
+from src.core.prompts.pipeline_prompt import (
+    fused_pipeline_prompt, FUSED_DRAFT_MARKER, FUSED_FORMATTED_MARKER, FUSED_FINAL_MARKER
+)
+
+STAGE_GENERATE = "generate"
+STAGE_FORMAT = "format"
+STAGE_SEO = "seo"
+STAGES = (STAGE_GENERATE, STAGE_FORMAT, STAGE_SEO)
+
+# Stage name -> (system prompt, result key)
+_STAGE_PROMPTS = {
+    STAGE_GENERATE: (content_prompt, "generated_content"),
+    STAGE_FORMAT: (formatting_prompt, "formatted_content"),
+    STAGE_SEO: (seo_prompt, "seo_content"),
+}
+
+MODE_STAGED = "staged"
+MODE_FUSED = "fused"
+
+class PipelineStageError(RuntimeError):
+    """Raised when a pipeline stage returns no output."""
+
+    def __init__(self, stage: str, message: str = None):
+        self.stage = stage
+        super().__init__(message or f"The '{stage}' stage returned an empty response or an error occurred.")
+
+def build_generation_input(user_query: str, reference_content: str = "") -> str:
+    """Builds the user prompt for the generation stage (same layout the frontend uses)."""
+    return f"User Intent:\n{user_query}\n\nReference Content:\n{reference_content or ''}"
+
+def normalize_stages(stages) -> list:
+    """
+    Validates the requested stages and returns them in pipeline order.
+
+    Raises:
+        ValueError: If a stage is unknown or none is given.
+    """
+    stages = list(STAGES) if stages is None else list(stages)
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        raise ValueError(f"Unknown pipeline stage(s): {', '.join(unknown)}. Choose from: {', '.join(STAGES)}.")
+    if not stages:
+        raise ValueError("At least one pipeline stage is required.")
+    return [stage for stage in STAGES if stage in stages]
+
+def validate_pipeline_options(stages, mode: str) -> list:
+    """
+    Checks a stages/mode combination before anything is sent to the model.
+
+    Returns:
+        The normalized stage list.
+
+    Raises:
+        ValueError: If the stages or mode are invalid.
+    """
+    stages = normalize_stages(stages)
+    if mode not in (MODE_STAGED, MODE_FUSED):
+        raise ValueError(f"Unknown pipeline mode '{mode}'. Choose '{MODE_STAGED}' or '{MODE_FUSED}'.")
+    if mode == MODE_FUSED and stages != list(STAGES):
+        raise ValueError("The fused mode always runs all three stages.")
+    return stages
+
+def split_fused_response(text: str) -> dict:
+    """
+    Splits a fused answer into its draft, formatted and final sections.
+
+    Raises:
+        PipelineStageError: If a section marker is missing.
+    """
+    positions = {}
+    for marker in (FUSED_DRAFT_MARKER, FUSED_FORMATTED_MARKER, FUSED_FINAL_MARKER):
+        position = text.find(marker)
+        if position < 0:
+            raise PipelineStageError(MODE_FUSED, f"The fused response is missing the '{marker}' section.")
+        positions[marker] = position
+
+    draft_start = positions[FUSED_DRAFT_MARKER] + len(FUSED_DRAFT_MARKER)
+    formatted_start = positions[FUSED_FORMATTED_MARKER] + len(FUSED_FORMATTED_MARKER)
+    final_start = positions[FUSED_FINAL_MARKER] + len(FUSED_FINAL_MARKER)
+    return {
+        "generated_content": text[draft_start:positions[FUSED_FORMATTED_MARKER]].strip(),
+        "formatted_content": text[formatted_start:positions[FUSED_FINAL_MARKER]].strip(),
+        "seo_content": text[final_start:].strip(),
+    }
+
+def _is_complete_fused_answer(text: str) -> bool:
+    """True if a fused answer has all three sections (only such answers are cached)."""
+    try:
+        split_fused_response(text)
+    except PipelineStageError:
+        return False
+    return True
+
+async def _generate(system_prompt: str, user_prompt: str, model_name: str, use_cache: bool, scheduler=None,
+                    validate=None):
+    """Runs one model call, holding a scheduler slot for the model when a scheduler is given."""
+    call = functools.partial(
+        generate_text_response_async,
+        system_prompt=system_prompt,
+        user_prompt=user_prompt,
+        model_name=model_name,
+        use_cache=use_cache,
+        validate=validate
+    )
+    if scheduler is None:
+        return await call()
+    async with scheduler.slot(model_name):
+        return await call()
+
+async def run_post_pipeline(user_query: str, reference_content: str = "", stages=None, mode: str = MODE_STAGED,
+                            use_cache: bool = True, model_name: str = config.DEFAULT_GEMINI_PRO_MODEL,
+                            scheduler=None, condense: bool = True, document_id: str = None,
+                            top_k: int = None) -> dict:
+    """
+    Runs the generate -> format -> SEO chain server-side.
+
+    In "staged" mode each stage is a separate model call whose output feeds the next
+    stage. In "fused" mode the three prompts are merged into one call that returns all
+    three artifacts, trading stage-by-stage control for latency.
+
+    Args:
+        user_query: What the user wants to post about.
+        reference_content: Optional reference text (e.g. a PDF analysis).
+        stages: Stages to run, any of STAGES (defaults to all). If "generate" is not
+            included, the first stage receives user_query as its input text, and
+            reference_content and document_id are ignored.
+        mode: MODE_STAGED or MODE_FUSED (fused requires all three stages).
+        use_cache: Set to False to bypass the response cache.
+        model_name: The Gemini model to use.
+        scheduler: Optional scheduler.ConcurrencyScheduler limiting concurrent model calls.
+        condense: Summarize reference_content first if it is over config.CONDENSE_TOKEN_BUDGET
+            with config.CONDENSE_MODEL (see condense.condense_reference). The summaries take
+            scheduler slots for that model like the stage calls.
+        document_id: Optional id of an indexed PDF analysis. The top_k pages most relevant
+            to user_query (default config.RETRIEVAL_TOP_K) are appended to reference_content.
+
+    Returns:
+        A dict with "mode", "stages", "generated_content", "formatted_content",
+        "seo_content" (None for stages that were not run), "timings" (seconds per stage)
+        and "reference_tokens" ({"original", "used"} estimated tokens of reference_content).
+
+    Raises:
+        ValueError: If the stages or mode are invalid, or the API key is missing.
+        PipelineStageError: If a stage produces no output.
+        DocumentNotFoundError: If document_id is not indexed.
+    """
+    stages = validate_pipeline_options(stages, mode)
+    # Only the generation step reads the reference content; later stages start from user_query
+    uses_reference = STAGE_GENERATE in stages or mode == MODE_FUSED
+
+    if document_id and uses_reference:
+        retrieved = await run_blocking(get_page_index().retrieve_reference, document_id, user_query, top_k)
+        reference_content = "\n".join(part for part in (reference_content, retrieved) if part)
+
+    result = {
+        "mode": mode,
+        "stages": stages,
+        "generated_content": None,
+        "formatted_content": None,
+        "seo_content": None,
+        "timings": {},
+        "reference_tokens": None,
+    }
+
+    if reference_content and condense and uses_reference:
+        started = time.perf_counter()
+        condensed = await condense_reference(reference_content, use_cache=use_cache, scheduler=scheduler)
+        reference_content = condensed["text"]
+        result["reference_tokens"] = {"original": condensed["original_tokens"], "used": condensed["tokens"]}
+        if condensed["rounds"]:
+            result["timings"]["condense"] = round(time.perf_counter() - started, 3)
+
+    if mode == MODE_FUSED:
+        started = time.perf_counter()
+        answer = await _generate(
+            fused_pipeline_prompt,
+            build_generation_input(user_query, reference_content),
+            model_name,
+            use_cache,
+            scheduler,
+            validate=_is_complete_fused_answer
+        )
+        if not answer:
+            raise PipelineStageError(MODE_FUSED)
+        result.update(split_fused_response(answer))
+        result["timings"][MODE_FUSED] = round(time.perf_counter() - started, 3)
+        return result
+
+    stage_input = build_generation_input(user_query, reference_content) if stages[0] == STAGE_GENERATE else user_query
+    for stage in stages:
+        system_prompt, result_key = _STAGE_PROMPTS[stage]
+        started = time.perf_counter()
+        output = await _generate(system_prompt, stage_input, model_name, use_cache, scheduler)
+        result["timings"][stage] = round(time.perf_counter() - started, 3)
+        if not output:
+            raise PipelineStageError(stage)
+        result[result_key] = output
+        stage_input = output
+
+    return result
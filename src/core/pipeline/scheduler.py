@@ -0,0 +1,73 @@
+import asyncio
+import contextlib
+import os
+import sys
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+import config
+
+class ConcurrencyScheduler:
+    """
+    Admits model calls under a global concurrency limit and a per-model limit.
+
+    A call first takes its model's slot and then a global slot, so a saturated model
+    never holds global capacity that calls to other models could use.
+    """
+
+    def __init__(self, global_limit: int, per_model_limit: int, model_overrides: dict = None):
+        """
+        Args:
+            global_limit: Maximum number of model calls in flight across all models.
+            per_model_limit: Default maximum number of calls in flight per model.
+            model_overrides: Optional {model name: limit} replacing per_model_limit for some models.
+        """
+        self.global_limit = max(1, global_limit)
+        self.per_model_limit = max(1, per_model_limit)
+        self.model_overrides = dict(model_overrides or {})
+        self._global = asyncio.Semaphore(self.global_limit)
+        self._per_model = {}
+        self.in_flight = {}
+
+    def limit_for(self, model_name: str) -> int:
+        return max(1, int(self.model_overrides.get(model_name, self.per_model_limit)))
+
+    @contextlib.asynccontextmanager
+    async def slot(self, model_name: str):
+        """Waits for a free slot for model_name and holds it for the duration of the block."""
+        model_semaphore = self._per_model.get(model_name)
+        if model_semaphore is None:
+            model_semaphore = self._per_model.setdefault(model_name, asyncio.Semaphore(self.limit_for(model_name)))
+
+        async with model_semaphore:
+            async with self._global:
+                self.in_flight[model_name] = self.in_flight.get(model_name, 0) + 1
+                try:
+                    yield
+                finally:
+                    self.in_flight[model_name] -= 1
+
+    def stats(self) -> dict:
+        return {
+            "global_limit": self.global_limit,
+            "per_model_limits": {model: self.limit_for(model) for model in self._per_model},
+            "in_flight": dict(self.in_flight),
+        }
+
+_scheduler = None
+
+def get_scheduler() -> ConcurrencyScheduler:
+    """
+    Returns the process-wide scheduler configured from config.py.
+    Must be called from the event loop that will use it.
+    """
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = ConcurrencyScheduler(
+            global_limit=config.BATCH_GLOBAL_CONCURRENCY,
+            per_model_limit=config.BATCH_PER_MODEL_CONCURRENCY,
+            model_overrides=config.MODEL_CONCURRENCY_OVERRIDES,
+        )
+    return _scheduler
@@ -0,0 +1,4 @@
+condense_prompt = """You will receive consecutive sections of a document analysis, each starting with a "--- Page N ---" or "--- Pages N-M ---" header, preceded by the maximum length of the summary in words.
+Condense them into one summary within that length that will be used as reference material for writing a LinkedIn post.
+Keep every key fact: names, numbers, results, methods, tools, dates and conclusions, and mention the page numbers they come from.
+Drop layout descriptions, repetition and filler. Do not add information that is not in the sections. Answer with the summary only."""
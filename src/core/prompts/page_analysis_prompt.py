@@ -0,0 +1,11 @@
+# Bump PAGE_ANALYSIS_PROMPT_VERSION whenever the wording below changes so that
+# cached page descriptions produced by the old prompt are no longer reused.
+PAGE_ANALYSIS_PROMPT_VERSION = 1
+
+page_analysis_prompt = "Describe the content of this document page ({page_number}/{page_count}). Focus on the main text, figures, and layout.summarize it and provide all key information."
+
+batch_page_analysis_prompt = """You will receive {batch_size} pages of the same document ({page_count} pages in total). Each page image is preceded by its label.
+Describe the content of every page separately. Focus on the main text, figures, and layout. Summarize each page and provide all key information.
+Start the description of each page with a header line of the exact form:
+=== Page N ===
+where N is the page number from its label. Use one header per page, in order, and do not add any text before the first header."""
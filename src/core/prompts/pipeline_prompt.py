@@ -0,0 +1,37 @@
+import os
+import sys
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.core.prompts.content_creation_prompt import content_prompt
+from src.core.prompts.formatter_prompt import formatting_prompt
+from src.core.prompts.seo_prompt import seo_prompt
+
+FUSED_DRAFT_MARKER = "=== DRAFT ==="
+FUSED_FORMATTED_MARKER = "=== FORMATTED ==="
+FUSED_FINAL_MARKER = "=== FINAL ==="
+
+fused_pipeline_prompt = f'''
+You will produce a LinkedIn post in three successive stages within a single answer.
+Each stage has its own role and instructions, given below. The output of each stage is the input of the next one.
+
+STAGE 1 - Draft the post:
+{content_prompt}
+
+STAGE 2 - Format the draft from stage 1:
+{formatting_prompt}
+
+STAGE 3 - Optimize the formatted post from stage 2:
+{seo_prompt}
+
+Answer with exactly three sections, in this order, each starting with its marker on its own line:
+{FUSED_DRAFT_MARKER}
+(the stage 1 draft)
+{FUSED_FORMATTED_MARKER}
+(the stage 2 formatted post)
+{FUSED_FINAL_MARKER}
+(the stage 3 optimized post)
+Do not write anything before the first marker.
+'''
@@ -0,0 +1,300 @@
+import array
+import collections
+import hashlib
+import math
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+import config
+from src.core.utils.stage_timing import stage_timer
+from src.core.utils.structured_logging import get_logger
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:  # Embeddings are optional; BM25 works without them
+    SentenceTransformer = None
+
+logger = get_logger("retrieval")
+
+# The "--- Page N ---" sections produced by /analyze-pdf/
+_PAGE_HEADER_PATTERN = re.compile(r"^--- Page (\d+) ---$", re.MULTILINE)
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were with"
+    " about into our we you your i me my they their them page document".split()
+)
+# Reciprocal rank fusion constant; 60 is the value commonly used for hybrid search
+_RRF_K = 60
+
+class DocumentNotFoundError(LookupError):
+    """Raised when no index exists for a document id."""
+
+def tokenize(text: str) -> list:
+    """Lowercased word tokens without stopwords."""
+    return [token for token in _TOKEN_PATTERN.findall((text or "").lower()) if token not in _STOPWORDS]
+
+def split_analysis(analysis: str) -> dict:
+    """Splits an /analyze-pdf/ analysis into {page number: description}."""
+    headers = list(_PAGE_HEADER_PATTERN.finditer(analysis or ""))
+    pages = {}
+    for position, header in enumerate(headers):
+        end = headers[position + 1].start() if position + 1 < len(headers) else len(analysis)
+        text = analysis[header.end():end].strip()
+        if text:
+            pages[int(header.group(1))] = text
+    return pages
+
+def document_id_for(pages: dict) -> str:
+    """Content address of a document: the same analysis always gets the same id."""
+    digest = hashlib.sha256()
+    for page_number in sorted(pages):
+        digest.update(f"{page_number}\x00{pages[page_number]}\x00".encode("utf-8"))
+    return digest.hexdigest()
+
+class BM25:
+    """Okapi BM25 over a fixed set of tokenized documents."""
+
+    def __init__(self, documents: list, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.term_frequencies = [collections.Counter(tokens) for tokens in documents]
+        self.lengths = [len(tokens) for tokens in documents]
+        self.average_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        document_frequencies = collections.Counter(term for tokens in documents for term in set(tokens))
+        count = len(documents)
+        self.idf = {
+            term: math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequencies.items()
+        }
+
+    def scores(self, query_tokens: list) -> list:
+        results = []
+        for frequencies, length in zip(self.term_frequencies, self.lengths):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * length / (self.average_length or 1))
+            for term in set(query_tokens):
+                frequency = frequencies.get(term)
+                if frequency:
+                    score += self.idf[term] * frequency * (self.k1 + 1) / (frequency + norm)
+            results.append(score)
+        return results
+
+_embedder = None
+_embedder_lock = threading.Lock()
+
+def get_embedder():
+    """
+    Returns the sentence-transformers model from config.RETRIEVAL_EMBEDDING_MODEL, loaded
+    once on CPU, or None if embeddings are disabled or the package is not installed.
+    """
+    global _embedder
+    if not config.RETRIEVAL_EMBEDDING_MODEL:
+        return None
+    if _embedder is None:
+        with _embedder_lock:
+            if _embedder is None:
+                if SentenceTransformer is None:
+                    logger.warning("RETRIEVAL_EMBEDDING_MODEL is set but sentence-transformers is not installed; using BM25 only.")
+                    _embedder = False
+                else:
+                    _embedder = SentenceTransformer(config.RETRIEVAL_EMBEDDING_MODEL, device="cpu")
+    return _embedder or None
+
+def _embed(embedder, texts: list) -> list:
+    """Unit-length float32 vectors, so cosine similarity is a dot product."""
+    with stage_timer("embed"):
+        vectors = embedder.encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+    return [array.array("f", (float(value) for value in vector)) for vector in vectors]
+
+def _dot(a: array.array, b: array.array) -> float:
+    return sum(x * y for x, y in zip(a, b))
+
+class _DocumentIndex:
+    """The in-memory BM25 index (and embeddings, if any) of one document."""
+
+    def __init__(self, pages: dict, embeddings: dict = None):
+        self.page_numbers = sorted(pages)
+        self.pages = pages
+        self.bm25 = BM25([tokenize(pages[number]) for number in self.page_numbers], k1=config.BM25_K1, b=config.BM25_B)
+        self.embeddings = embeddings or {}
+
+    def search(self, query: str, top_k: int, embedder=None) -> list:
+        bm25_scores = dict(zip(self.page_numbers, self.bm25.scores(tokenize(query))))
+        similarities = {}
+        if embedder is not None and len(self.embeddings) == len(self.page_numbers):
+            query_vector = _embed(embedder, [query])[0]
+            similarities = {number: _dot(query_vector, self.embeddings[number]) for number in self.page_numbers}
+
+        if similarities:
+            # Fuse the two rankings by rank, which needs no score normalization
+            fused = collections.defaultdict(float)
+            for ranking in (bm25_scores, similarities):
+                ordered = sorted(self.page_numbers, key=lambda number: (-ranking[number], number))
+                for rank, number in enumerate(ordered, start=1):
+                    fused[number] += 1.0 / (_RRF_K + rank)
+            ranked = sorted(self.page_numbers, key=lambda number: (-fused[number], number))
+        else:
+            ranked = sorted(self.page_numbers, key=lambda number: (-bm25_scores[number], number))
+
+        return [
+            {
+                "page": number,
+                "score": round(bm25_scores[number], 4),
+                "similarity": round(similarities[number], 4) if similarities else None,
+                "text": self.pages[number],
+            }
+            for number in ranked[:max(1, top_k)]
+        ]
+
+class PageIndex:
+    """
+    Per-document page indexes, persisted in SQLite and kept in memory for the most
+    recently used documents. Safe to share between threads.
+    """
+
+    def __init__(self, db_path: str, cache_documents: int):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._cache = collections.OrderedDict()
+        self._cache_documents = max(1, cache_documents)
+        with self._lock:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS page_index_documents ("
+                "id TEXT PRIMARY KEY, page_count INTEGER NOT NULL, embedding_model TEXT, created_at REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS page_index_pages ("
+                "document_id TEXT NOT NULL, page_number INTEGER NOT NULL, text TEXT NOT NULL, embedding BLOB, "
+                "PRIMARY KEY (document_id, page_number))"
+            )
+            self._db.commit()
+
+    def add_document(self, analysis: str) -> dict:
+        """
+        Indexes the pages of an /analyze-pdf/ analysis. Indexing the same analysis
+        again is a no-op.
+
+        Returns:
+            A dict with "document_id" and "page_count".
+
+        Raises:
+            ValueError: If the analysis has no "--- Page N ---" sections.
+        """
+        pages = split_analysis(analysis)
+        if not pages:
+            raise ValueError("The analysis has no '--- Page N ---' sections to index.")
+        document_id = document_id_for(pages)
+        with self._lock:
+            exists = self._db.execute("SELECT 1 FROM page_index_documents WHERE id = ?", (document_id,)).fetchone()
+        if not exists:
+            embeddings = self._embed_pages(pages)
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR IGNORE INTO page_index_documents (id, page_count, embedding_model, created_at) VALUES (?, ?, ?, ?)",
+                    (document_id, len(pages), config.RETRIEVAL_EMBEDDING_MODEL if embeddings else None, time.time())
+                )
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO page_index_pages (document_id, page_number, text, embedding) VALUES (?, ?, ?, ?)",
+                    [
+                        (document_id, number, text, embeddings[number].tobytes() if embeddings else None)
+                        for number, text in pages.items()
+                    ]
+                )
+                self._db.commit()
+            logger.info("Indexed document %s (%d pages).", document_id[:12], len(pages))
+        return {"document_id": document_id, "page_count": len(pages)}
+
+    def _embed_pages(self, pages: dict) -> dict:
+        embedder = get_embedder()
+        if embedder is None:
+            return {}
+        numbers = sorted(pages)
+        return dict(zip(numbers, _embed(embedder, [pages[number] for number in numbers])))
+
+    def _load(self, document_id: str) -> _DocumentIndex:
+        with self._lock:
+            index = self._cache.get(document_id)
+            if index is not None:
+                self._cache.move_to_end(document_id)
+                return index
+            document = self._db.execute(
+                "SELECT embedding_model FROM page_index_documents WHERE id = ?", (document_id,)
+            ).fetchone()
+            if document is None:
+                raise DocumentNotFoundError(f"No page index for document '{document_id}'. Analyze the PDF first.")
+            rows = self._db.execute(
+                "SELECT page_number, text, embedding FROM page_index_pages WHERE document_id = ?", (document_id,)
+            ).fetchall()
+
+        pages = {number: text for number, text, _ in rows}
+        embeddings = {}
+        if document[0] and document[0] == config.RETRIEVAL_EMBEDDING_MODEL:
+            for number, _, blob in rows:
+                vector = array.array("f")
+                vector.frombytes(blob)
+                embeddings[number] = vector
+        elif get_embedder() is not None:
+            # Indexed without embeddings or with another model: compute them now and keep them
+            embeddings = self._embed_pages(pages)
+            with self._lock:
+                self._db.executemany(
+                    "UPDATE page_index_pages SET embedding = ? WHERE document_id = ? AND page_number = ?",
+                    [(vector.tobytes(), document_id, number) for number, vector in embeddings.items()]
+                )
+                self._db.execute(
+                    "UPDATE page_index_documents SET embedding_model = ? WHERE id = ?",
+                    (config.RETRIEVAL_EMBEDDING_MODEL, document_id)
+                )
+                self._db.commit()
+
+        index = _DocumentIndex(pages, embeddings)
+        with self._lock:
+            self._cache[document_id] = index
+            while len(self._cache) > self._cache_documents:
+                self._cache.popitem(last=False)
+        return index
+
+    def search(self, document_id: str, query: str, top_k: int = None) -> list:
+        """
+        Ranks the pages of a document by relevance to query: BM25, fused with embedding
+        similarity when config.RETRIEVAL_EMBEDDING_MODEL is available.
+
+        Returns:
+            Up to top_k (default config.RETRIEVAL_TOP_K) {"page", "score", "similarity", "text"}
+            dicts, most relevant first ("similarity" is None without embeddings).
+
+        Raises:
+            DocumentNotFoundError: If the document was never indexed.
+        """
+        top_k = config.RETRIEVAL_TOP_K if top_k is None else top_k
+        with stage_timer("retrieval"):
+            return self._load(document_id).search(query, top_k, get_embedder())
+
+    def retrieve_reference(self, document_id: str, query: str, top_k: int = None) -> str:
+        """
+        Returns the top_k pages most relevant to query as reference content: their
+        "--- Page N ---" sections, in page order.
+        """
+        results = sorted(self.search(document_id, query, top_k), key=lambda result: result["page"])
+        return "\n".join(f"--- Page {result['page']} ---\n{result['text']}\n" for result in results)
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_page_index() -> PageIndex:
+    """Returns the process-wide page index configured from config.py."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = PageIndex(config.PAGE_INDEX_DB_PATH, config.PAGE_INDEX_CACHE_DOCUMENTS)
+    return _index
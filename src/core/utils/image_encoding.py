@@ -0,0 +1,53 @@
+import io
+
+from PIL import Image
+
+# Output format name -> (PIL format, MIME type)
+IMAGE_FORMATS = {
+    "png": ("PNG", "image/png"),
+    "jpeg": ("JPEG", "image/jpeg"),
+    "webp": ("WEBP", "image/webp"),
+}
+
+def normalize_image_format(image_format: str) -> str:
+    """
+    Validates an output format name ("png", "jpeg"/"jpg" or "webp").
+
+    Raises:
+        ValueError: If the format is not supported.
+    """
+    name = (image_format or "").lower()
+    if name == "jpg":
+        name = "jpeg"
+    if name not in IMAGE_FORMATS:
+        raise ValueError(f"Unsupported image format '{image_format}'. Choose one of: {', '.join(IMAGE_FORMATS)}.")
+    return name
+
+def encode_image(image: Image.Image, image_format: str = "png", quality: int = 85) -> tuple:
+    """
+    Encodes a PIL image in memory.
+
+    Args:
+        image: The image to encode.
+        image_format: "png", "jpeg" or "webp".
+        quality: Lossy quality (1-100) for JPEG and WebP; ignored for PNG.
+
+    Returns:
+        A (bytes, mime_type) tuple.
+    """
+    name = normalize_image_format(image_format)
+    pil_format, mime_type = IMAGE_FORMATS[name]
+
+    if name == "jpeg" and image.mode not in ("RGB", "L"):
+        # JPEG has no alpha channel
+        image = image.convert("RGB")
+
+    save_kwargs = {}
+    if name in ("jpeg", "webp"):
+        save_kwargs["quality"] = max(1, min(100, int(quality)))
+    if name == "png":
+        save_kwargs["optimize"] = False  # Favor encode speed over a few percent of size
+
+    buffer = io.BytesIO()
+    image.save(buffer, format=pil_format, **save_kwargs)
+    return buffer.getvalue(), mime_type
@@ -0,0 +1,88 @@
+import os
+import sys
+
+from PIL import Image, ImageOps
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+import config
+from src.core.utils.image_encoding import normalize_image_format
+
+FIT_COVER = "cover"      # Fill the target box exactly, center-cropping the overflow
+FIT_CONTAIN = "contain"  # Fit inside the target box, keeping the whole image
+
+SIZE_ORIGINAL = "original"
+
+# Preset name -> (width, height, fit)
+IMAGE_SIZE_PRESETS = {
+    SIZE_ORIGINAL: None,
+    "linkedin": (1200, 627, FIT_COVER),
+    "square": (1080, 1080, FIT_COVER),
+    "thumbnail": (320, 320, FIT_CONTAIN),
+}
+
+MAX_OUTPUT_DIMENSION = 4096
+
+def build_output_options(image_format: str = None, quality: int = None, size: str = None,
+                         width: int = None, height: int = None) -> dict:
+    """
+    Validates per-request image output settings, filling gaps from config.py.
+
+    Args:
+        image_format: "png", "jpeg" or "webp".
+        quality: Lossy quality (1-100) for JPEG and WebP.
+        size: A preset from IMAGE_SIZE_PRESETS ("original", "linkedin", "square", "thumbnail").
+        width, height: Explicit target box in pixels; overrides the preset. The image is
+            center-cropped to fill it, or fitted inside it if only one side is given.
+
+    Returns:
+        A dict with "image_format", "quality", "width", "height" and "fit"
+        (width and height are None for the original size).
+
+    Raises:
+        ValueError: If a setting is out of range or unknown.
+    """
+    quality = config.IMAGE_OUTPUT_QUALITY if quality is None else quality
+    if not 1 <= quality <= 100:
+        raise ValueError("quality must be between 1 and 100.")
+
+    size = (size or config.IMAGE_OUTPUT_SIZE).lower()
+    if size not in IMAGE_SIZE_PRESETS:
+        raise ValueError(f"Unknown size preset '{size}'. Choose one of: {', '.join(IMAGE_SIZE_PRESETS)}.")
+
+    if width is not None or height is not None:
+        for name, value in (("width", width), ("height", height)):
+            if value is not None and not 1 <= value <= MAX_OUTPUT_DIMENSION:
+                raise ValueError(f"{name} must be between 1 and {MAX_OUTPUT_DIMENSION} pixels.")
+        fit = FIT_COVER if width is not None and height is not None else FIT_CONTAIN
+        width = MAX_OUTPUT_DIMENSION if width is None else width
+        height = MAX_OUTPUT_DIMENSION if height is None else height
+    elif IMAGE_SIZE_PRESETS[size]:
+        width, height, fit = IMAGE_SIZE_PRESETS[size]
+    else:
+        width = height = fit = None
+
+    return {
+        "image_format": normalize_image_format(image_format or config.IMAGE_OUTPUT_FORMAT),
+        "quality": quality,
+        "width": width,
+        "height": height,
+        "fit": fit,
+    }
+
+def is_original_png(options: dict) -> bool:
+    """True if the options ask for the stored image unchanged."""
+    return options["image_format"] == "png" and options["width"] is None
+
+def resize_image(image: Image.Image, options: dict) -> Image.Image:
+    """Resizes an image to the target box in options (a no-op for the original size)."""
+    if options["width"] is None:
+        return image
+    box = (options["width"], options["height"])
+    if options["fit"] == FIT_COVER:
+        return ImageOps.fit(image, box, method=Image.LANCZOS)
+    resized = image.copy()
+    resized.thumbnail(box, Image.LANCZOS)  # Never upscales
+    return resized
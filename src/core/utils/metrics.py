@@ -0,0 +1,183 @@
+import contextlib
+import math
+import threading
+
+# Latency buckets in seconds, from cache hits to slow image generations
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _Metric:
+    type_name = None
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}.")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: tuple) -> dict:
+        return dict(zip(self.labelnames, key))
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(self._labels(key), value))
+        return lines
+
+    def _render_sample(self, labels: dict, value) -> list:
+        return [f"{self.name}{_format_labels(labels)} {_format_value(value)}"]
+
+class Counter(_Metric):
+    """A monotonically increasing count."""
+
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    """A value that goes up and down, e.g. requests in flight."""
+
+    type_name = "gauge"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextlib.contextmanager
+    def track(self, **labels):
+        """Counts the block as in progress while it runs."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+class Histogram(_Metric):
+    """Cumulative bucket counts plus the sum and count of observations."""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    def _render_sample(self, labels: dict, state) -> list:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, state["counts"]):
+            cumulative += count
+            lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': _format_value(bound)})} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(state['sum'])}")
+        lines.append(f"{self.name}_count{_format_labels(labels)} {state['count']}")
+        return lines
+
+class Registry:
+    """Holds metrics and renders them in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "linkgenix_http_request_duration_seconds",
+    "Time until the response headers were ready, by route, method and status.",
+    ("endpoint", "method", "status"),
+))
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "linkgenix_http_requests_in_flight",
+    "Requests currently being handled, by route.",
+    ("endpoint",),
+))
+STAGE_DURATION = REGISTRY.register(Histogram(
+    "linkgenix_stage_duration_seconds",
+    "Time spent in each processing stage (rasterize, encode, upstream calls, waits).",
+    ("stage",),
+))
+UPSTREAM_CALLS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "linkgenix_upstream_calls_in_flight",
+    "Model calls currently waiting on an upstream, by provider and model.",
+    ("provider", "model"),
+))
+UPSTREAM_TOKENS = REGISTRY.register(Counter(
+    "linkgenix_upstream_tokens_total",
+    "Tokens reported in the upstream usage metadata, by model and kind (prompt, output, cached).",
+    ("model", "kind"),
+))
+UPSTREAM_ERRORS = REGISTRY.register(Counter(
+    "linkgenix_upstream_errors_total",
+    "Failed or degraded model calls, by provider, model and reason.",
+    ("provider", "model", "reason"),
+))
+LOG_RECORDS_DROPPED = REGISTRY.register(Counter(
+    "linkgenix_log_records_dropped_total",
+    "Log records dropped because the logging queue was full.",
+))
+
+def record_token_usage(model_name: str, prompt_tokens: int = None, output_tokens: int = None, cached_tokens: int = None):
+    """
+    Counts the tokens of one model response (missing counts are skipped). cached_tokens
+    is the part of the prompt served from a context cache.
+    """
+    if prompt_tokens:
+        UPSTREAM_TOKENS.inc(prompt_tokens, model=model_name, kind="prompt")
+    if output_tokens:
+        UPSTREAM_TOKENS.inc(output_tokens, model=model_name, kind="output")
+    if cached_tokens:
+        UPSTREAM_TOKENS.inc(cached_tokens, model=model_name, kind="cached")
+
+def record_upstream_error(provider: str, model_name: str, reason: str):
+    UPSTREAM_ERRORS.inc(provider=provider, model=model_name, reason=reason)
+
+def render_metrics() -> str:
+    return REGISTRY.render()
@@ -0,0 +1,43 @@
+import contextlib
+import contextvars
+import threading
+import time
+
+from src.core.utils.metrics import STAGE_DURATION
+
+# Per-request {stage name: seconds}; shared with executor threads through the copied context
+_request_timings = contextvars.ContextVar("linkgenix_request_timings", default=None)
+_lock = threading.Lock()
+
+def start_request_timings() -> dict:
+    """Starts collecting stage timings for the current request and returns the collector."""
+    timings = {}
+    _request_timings.set(timings)
+    return timings
+
+def record_stage(stage: str, seconds: float):
+    """
+    Observes the stage duration in the /metrics histogram and adds it to the current
+    request's timings (outside a request, e.g. in background jobs, only the former).
+    """
+    STAGE_DURATION.observe(seconds, stage=stage)
+    timings = _request_timings.get()
+    if timings is None:
+        return
+    with _lock:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+@contextlib.contextmanager
+def stage_timer(stage: str):
+    """Records the wall time of the block under the given stage name."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+def server_timing_header(timings: dict) -> str:
+    """Formats timings as a Server-Timing header value (durations in milliseconds)."""
+    with _lock:
+        items = list(timings.items())
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in items)
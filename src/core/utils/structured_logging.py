@@ -0,0 +1,126 @@
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+import config
+from src.core.utils.metrics import LOG_RECORDS_DROPPED
+
+ROOT_LOGGER_NAME = "linkgenix"
+
+# Correlates every record of one request, including those logged from executor threads
+_request_id = contextvars.ContextVar("linkgenix_request_id", default="-")
+
+# Attributes every LogRecord has; anything else was passed through extra= and is logged as a field
+_RESERVED_ATTRIBUTES = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime", "request_id"}
+
+_listener = None
+_lock = threading.Lock()
+
+def get_logger(name: str) -> logging.Logger:
+    """Returns the logger for a component, e.g. get_logger("text") -> "linkgenix.text"."""
+    return logging.getLogger(f"{ROOT_LOGGER_NAME}.{name}")
+
+def set_request_id(request_id: str):
+    """Tags the records logged from the current context with request_id."""
+    _request_id.set(request_id)
+
+def get_request_id() -> str:
+    return _request_id.get()
+
+class _RequestIdFilter(logging.Filter):
+    # Runs in the caller's thread before the record is queued, where the request context is visible
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        return True
+
+class _DroppingQueueHandler(QueueHandler):
+    """Hands records to the listener thread and drops them instead of blocking when the queue is full."""
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the timestamp, level, logger, request id, message and extra fields."""
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRIBUTES:
+                entry[key] = value
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+def _build_formatter() -> logging.Formatter:
+    if config.LOG_FORMAT == "text":
+        return logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+    return JsonFormatter()
+
+def configure_logging():
+    """
+    Routes the "linkgenix" loggers through a bounded queue to a background thread
+    that formats and writes them to stderr, so callers never block on I/O.
+    Levels come from config.LOG_LEVEL and config.LOG_LEVELS. Safe to call twice.
+    """
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return
+
+        output = logging.StreamHandler(sys.stderr)
+        output.setFormatter(_build_formatter())
+
+        log_queue = queue.Queue(maxsize=max(1, config.LOG_QUEUE_SIZE))
+        handler = _DroppingQueueHandler(log_queue)
+        handler.addFilter(_RequestIdFilter())
+
+        root = logging.getLogger(ROOT_LOGGER_NAME)
+        root.handlers = [handler]
+        root.setLevel(config.LOG_LEVEL)
+        root.propagate = False
+        for name, level in config.LOG_LEVELS.items():
+            logging.getLogger(name).setLevel(str(level).upper())
+
+        _listener = QueueListener(log_queue, output, respect_handler_level=True)
+        _listener.start()
+
+def shutdown_logging():
+    """Writes out the queued records and stops the background thread."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+def truncate_for_log(text: str, max_chars: int = None) -> str:
+    """Cuts text to max_chars (default config.LOG_PROMPT_MAX_CHARS), noting how much was left out."""
+    max_chars = config.LOG_PROMPT_MAX_CHARS if max_chars is None else max_chars
+    if text is None or len(text) <= max_chars:
+        return text
+    return f"{text[:max_chars]}... [{len(text) - max_chars} more chars]"
+
+def log_prompt(logger: logging.Logger, message: str, prompt: str, **fields):
+    """
+    Logs a prompt at DEBUG level for a sample of calls (config.LOG_PROMPT_SAMPLE_RATE),
+    truncated to config.LOG_PROMPT_MAX_CHARS. Costs nothing when DEBUG is off.
+    """
+    if not logger.isEnabledFor(logging.DEBUG) or random.random() >= config.LOG_PROMPT_SAMPLE_RATE:
+        return
+    logger.debug(message, extra={**fields, "prompt": truncate_for_log(prompt), "prompt_chars": len(prompt)})
@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+import config
+from src.core.pdf.render_options import build_render_options
+
+def test_defaults_fill_missing_settings():
+    options = build_render_options()
+    assert options["dpi"] == config.DEFAULT_PDF_DPI
+    assert options["long_edge"] == config.PDF_TARGET_LONG_EDGE
+    assert options["image_quality"] == config.PDF_IMAGE_QUALITY
+
+@pytest.mark.parametrize("setting", ["dpi", "long_edge", "image_quality"])
+def test_zero_is_rejected_instead_of_defaulted(setting):
+    with pytest.raises(ValueError):
+        build_render_options(**{setting: 0})